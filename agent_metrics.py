@@ -0,0 +1,103 @@
+# agent_metrics.py
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import LLM_SECONDS, LLM_TOKENS, TOOL_SECONDS
+
+
+def token_usage(response) -> tuple[int, int]:
+    """(prompt, completion) tokens of one LLMResult."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    if prompt is None:
+        # streaming runs: usage rides on the aggregated message instead
+        prompt = completion = 0
+        for gens in response.generations:
+            for gen in gens:
+                meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                prompt += meta.get("input_tokens", 0)
+                completion += meta.get("output_tokens", 0)
+    return prompt or 0, completion or 0
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callbacks → Prometheus: per-tool latency, per-model LLM latency
+    and prompt/completion token counters. Pass via
+    agent.astream(..., config={"callbacks": [agent_metrics]}).
+    """
+
+    run_inline = True  # cheap bookkeeping, no need for an executor hop
+
+    def __init__(self):
+        self._started: dict = {}  # run_id → (name, t0)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or \
+            (kwargs.get("metadata") or {}).get("ls_model_name") or "unknown"
+        self._started[run_id] = (model, time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, **kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, t0 = self._started.pop(run_id, ("unknown", None))
+        if t0 is not None:
+            LLM_SECONDS.observe(time.perf_counter() - t0, model=model)
+
+        prompt, completion = token_usage(response)
+        if prompt:
+            LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+        if completion:
+            LLM_TOKENS.inc(completion, model=model, kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = ((serialized or {}).get("name", "unknown"), time.perf_counter())
+
+    def _tool_done(self, run_id, status: str):
+        name, t0 = self._started.pop(run_id, ("unknown", None))
+        if t0 is not None:
+            TOOL_SECONDS.observe(time.perf_counter() - t0, tool=name, status=status)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, "error")
+
+
+agent_metrics = MetricsCallbackHandler()
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Per-request token usage: one instance per agent run, passed next to agent_metrics."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self.tool_calls = 0
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt, completion = token_usage(response)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.llm_calls += 1
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tool_calls += 1
+
+    def summary(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+        }
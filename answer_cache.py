@@ -0,0 +1,186 @@
+# answer_cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import normalize_query
+from shared_cache import digest, remaining_ttl, safe_call
+
+PUBLIC_SCOPE = "public"
+# bumped by invalidate() → other workers drop their local copies; one counter
+# for "everything" plus one per scope, so invalidating a user keeps the rest
+GENERATION_KEY = "ansgen:all"
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache for final agent answers.
+
+    Entries live in a *scope*: "public" for catalog/policy questions, or the
+    user's email for anything touching their orders, so a cached answer is
+    never served across accounts. Lookup is exact on the normalized question;
+    if `embed_fn` is given, a near-duplicate question (cosine >= threshold)
+    in the same scope also counts as a hit.
+
+    With `shared` (see shared_cache.py), exact answers are also written to a
+    cache every worker reads; semantic matching stays per worker.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 600,
+                 embed_fn=None, similarity_threshold: float = 0.95, shared=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.shared = shared
+        self._generation = None
+        self._scope_generations: dict[str, object] = {}
+        # key = (scope, normalized question) → (stored_at, answer, vector|None)
+        self._data: "OrderedDict[tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope_for(email: str | None, personal: bool) -> str:
+        if personal:
+            return "user:" + (email or "").strip().lower()
+        return PUBLIC_SCOPE
+
+    @staticmethod
+    def _shared_key(key: tuple[str, str]) -> str:
+        # ans:<scope hash>:<question hash> → one scope is a single MATCH pattern
+        return f"ans:{digest(key[0])}:{digest(key[1])}"
+
+    @staticmethod
+    def _generation_key(scope: str) -> str:
+        return f"ansgen:{digest(scope)}"
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return now - stored_at > self.ttl_seconds
+
+    def _sync_generation(self, scope: str):
+        """Another worker invalidated → local entries may be stale, drop them."""
+        generation = safe_call(self.shared.get, GENERATION_KEY)
+        scope_generation = safe_call(self.shared.get, self._generation_key(scope))
+        with self._lock:
+            if generation != self._generation:
+                self._data.clear()
+                self._scope_generations.clear()
+                self._generation = generation
+            if scope not in self._scope_generations \
+                    or self._scope_generations[scope] != scope_generation:
+                for k in [k for k in self._data if k[0] == scope]:
+                    del self._data[k]
+                self._scope_generations[scope] = scope_generation
+
+    def get(self, scope: str, question: str, qvec=None):
+        """Return a cached answer or None. `qvec` enables the semantic match."""
+        key = (scope, normalize_query(question))
+        if self.shared is not None:
+            self._sync_generation(scope)
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and not self._expired(item[0], now):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+
+        if self.shared is not None:
+            shared_key = self._shared_key(key)
+            raw = safe_call(self.shared.get, shared_key)
+            if raw is not None:
+                answer = json.loads(raw)["answer"]
+                # keep the shared expiry: re-stamping with `now` would double the TTL
+                left = remaining_ttl(self.shared, shared_key, self.ttl_seconds)
+                with self._lock:
+                    self._data[key] = (now - (self.ttl_seconds - left), answer, None)
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return answer
+
+        with self._lock:
+            if qvec is not None:
+                best_key, best_sim = None, self.similarity_threshold
+                q = np.asarray(qvec, dtype=np.float32)
+                q = q / (np.linalg.norm(q) or 1.0)
+                for k, (stored_at, _, vec) in self._data.items():
+                    if k[0] != scope or vec is None or self._expired(stored_at, now):
+                        continue
+                    sim = float(q @ vec)
+                    if sim >= best_sim:
+                        best_key, best_sim = k, sim
+                if best_key is not None:
+                    self._data.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    return self._data[best_key][1]
+
+            self.misses += 1
+            return None
+
+    def put(self, scope: str, question: str, answer, qvec=None):
+        vec = None
+        if qvec is not None:
+            vec = np.asarray(qvec, dtype=np.float32)
+            vec = vec / (np.linalg.norm(vec) or 1.0)
+        key = (scope, normalize_query(question))
+        with self._lock:
+            self._data[key] = (time.monotonic(), answer, vec)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        if self.shared is not None and self.ttl_seconds >= 1:
+            safe_call(self.shared.set, self._shared_key(key),
+                      json.dumps({"answer": answer}, ensure_ascii=False),
+                      ex=int(self.ttl_seconds))
+
+    def invalidate(self, scope: str | None = None) -> int:
+        """Drop every entry (or only one scope). Call when product data changes."""
+        with self._lock:
+            if scope is None:
+                removed = len(self._data)
+                self._data.clear()
+            else:
+                keys = [k for k in self._data if k[0] == scope]
+                for k in keys:
+                    del self._data[k]
+                removed = len(keys)
+
+        if self.shared is not None:
+            pattern = "ans:*:*" if scope is None else f"ans:{digest(scope)}:*"
+            keys = safe_call(lambda: list(self.shared.scan_iter(match=pattern)), default=[])
+            shared_removed = 0
+            for i in range(0, len(keys), 500):
+                shared_removed += safe_call(self.shared.delete, *keys[i:i + 500], default=0)
+            safe_call(self.shared.incr,
+                      GENERATION_KEY if scope is None else self._generation_key(scope))
+            # every local entry is written through, so the shared count covers them
+            removed = max(removed, shared_removed)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "semantic": self.embed_fn is not None,
+            "shared": self.shared is not None,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
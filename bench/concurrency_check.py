@@ -0,0 +1,65 @@
+# bench/concurrency_check.py
+"""
+Fire N concurrent requests at a running gateway and compare wall time with
+the sum of per-request latencies. If the event loop is blocked, requests
+serialize and wall ≈ sum; if not, wall ≈ slowest single request.
+
+    py -m uvicorn main_api:main --port 5068
+    py bench/concurrency_check.py --base-url http://localhost:5068 -n 8
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+
+async def _timed(session, method, url, **kwargs):
+    t0 = time.perf_counter()
+    async with session.request(method, url, **kwargs) as resp:
+        await resp.read()
+        status = resp.status
+    return status, time.perf_counter() - t0
+
+
+async def run(base_url: str, n: int, sql_query: str, match_query: str):
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        jobs = []
+        for _ in range(n):
+            # slow agent call + fast match call interleaved
+            jobs.append(_timed(session, "POST", f"{base_url}/sql/sql",
+                               json={"query": sql_query}))
+            jobs.append(_timed(session, "GET", f"{base_url}/match/match_product",
+                               params={"query": match_query}))
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*jobs)
+        wall = time.perf_counter() - t0
+
+    latencies = [lat for _, lat in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    serial = sum(latencies)
+    print(f"requests      : {len(results)}  statuses={statuses}")
+    print(f"wall time     : {wall:.2f}s")
+    print(f"sum latencies : {serial:.2f}s")
+    print(f"max latency   : {max(latencies):.2f}s")
+    print(f"overlap ratio : {serial / wall:.1f}x  (≈1x means requests serialized)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:5068")
+    parser.add_argument("-n", type=int, default=8,
+                        help="number of /sql + /match pairs")
+    parser.add_argument("--sql-query", default="Shop có những thương hiệu nào?")
+    parser.add_argument("--match-query", default="yonex astrox 88d")
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.n, args.sql_query, args.match_query))
+
+
+if __name__ == "__main__":
+    main()
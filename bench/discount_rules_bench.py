@@ -0,0 +1,80 @@
+# bench/discount_rules_bench.py
+"""
+1) Equivalence check: the declarative DiscountRuleEngine must return exactly
+   what decide_discount_and_reason returns, over many random thresholds and
+   inventories (including the boundary values low, high, 2*high, 3*high).
+2) Speed: per-row Python ladder vs column-wise evaluation on N products.
+
+    py bench/discount_rules_bench.py --products 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "bench-not-used")  # LLM is never called
+
+from discount_rules import DiscountRuleEngine  # noqa: E402
+from sale_anal_noloop import decide_discount_and_reason  # noqa: E402
+
+
+def check_equivalence(engine: DiscountRuleEngine, cases: int, seed: int = 0):
+    rnd = random.Random(seed)
+    checked = 0
+    for _ in range(cases):
+        high = rnd.randint(1, 500)
+        low = rnd.randint(0, 2 * high)
+        boundaries = [low - 1, low, low + 1, high - 1, high, high + 1,
+                      2 * high - 1, 2 * high, 3 * high - 1, 3 * high, 3 * high + 1]
+        inv = [max(0, b) for b in boundaries] + [rnd.randint(0, 10 * high) for _ in range(50)]
+
+        discounts, codes = engine.evaluate(inv, high, low)
+        for q, d, c in zip(inv, discounts.tolist(), codes.tolist()):
+            expected = decide_discount_and_reason(q, high, low)
+            got = (d, engine.reason_text(c))
+            assert got == expected, f"inv={q} high={high} low={low}: {got} != {expected}"
+            checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--high", type=int, default=30)
+    parser.add_argument("--low", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = DiscountRuleEngine()
+    checked = check_equivalence(engine, args.cases)
+    print(f"✅ Equivalent on {checked:,} (inventory, high, low) samples")
+
+    rng = np.random.default_rng(42)
+    inventory = rng.exponential(40, args.products).astype(np.int64)
+    inventory_list = inventory.tolist()
+
+    t0 = time.perf_counter()
+    ladder = [decide_discount_and_reason(q, args.high, args.low) for q in inventory_list]
+    loop_t = time.perf_counter() - t0
+
+    vec_t = None
+    for _ in range(5):  # best of 5
+        t0 = time.perf_counter()
+        discounts, codes = engine.evaluate(inventory, args.high, args.low)
+        elapsed = time.perf_counter() - t0
+        vec_t = elapsed if vec_t is None else min(vec_t, elapsed)
+
+    assert [d for d, _ in ladder] == discounts.tolist()
+    assert [r for _, r in ladder] == [engine.reason_text(c) for c in codes.tolist()]
+    print(f"per-row ladder : {loop_t * 1000:8.1f} ms  ({args.products:,} products)")
+    print(f"rule engine    : {vec_t * 1000:8.1f} ms")
+    print(f"speed-up       : {loop_t / vec_t:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
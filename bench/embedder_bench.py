@@ -0,0 +1,83 @@
+# bench/embedder_bench.py
+"""
+Compare embedders on a labeled query set: per-query embedding latency and
+recall@1 / recall@k of the expected product_id.
+
+Each config is EMBEDDER:COLLECTION, the collection having been built with
+that embedder (see product_indexer.py reembed). Search is exact (NumPy)
+over the whole collection, so results reflect the embeddings, not HNSW.
+
+    py bench/embedder_bench.py --queries bench/labeled_queries.jsonl \
+        --config openai:product_descriptions \
+        --config local:product_descriptions_local
+
+Labeled file: one JSON object per line, {"query": "...", "product_id": 123}.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from embedders import get_embedder  # noqa: E402
+from product_indexer import chroma_client  # noqa: E402
+from vector_index import LocalVectorIndex  # noqa: E402
+
+
+def load_labeled(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(kind: str, collection_name: str, labeled: list, k: int):
+    embedder = get_embedder(kind)
+    index = LocalVectorIndex(chroma_client().get_collection(collection_name))
+    index.refresh()
+
+    latencies, hit1, hitk = [], 0, 0
+    for item in labeled:
+        t0 = time.perf_counter()
+        qvec = embedder.embed([item["query"]])[0]
+        latencies.append(time.perf_counter() - t0)
+
+        res = index.query([qvec], n_results=k)
+        ranked = [str((m or {}).get("product_id")) for m in res["metadatas"][0]]
+        expected = str(item["product_id"])
+        hit1 += ranked[:1] == [expected]
+        hitk += expected in ranked
+
+    lat = np.asarray(latencies) * 1000
+    return {
+        "embedder": embedder.name,
+        "collection": collection_name,
+        "dim": index.stats()["dim"],
+        "queries": len(labeled),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "recall@1": round(hit1 / len(labeled), 3),
+        f"recall@{k}": round(hitk / len(labeled), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=os.path.join(
+        os.path.dirname(__file__), "labeled_queries.example.jsonl"))
+    parser.add_argument("--config", action="append", required=True,
+                        help="EMBEDDER:COLLECTION, repeatable")
+    parser.add_argument("-k", type=int, default=8)
+    args = parser.parse_args()
+
+    labeled = load_labeled(args.queries)
+    for cfg in args.config:
+        kind, collection_name = cfg.split(":", 1)
+        print(json.dumps(evaluate(kind, collection_name, labeled, args.k), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
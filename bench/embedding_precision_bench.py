@@ -0,0 +1,154 @@
+# bench/embedding_precision_bench.py
+"""
+Pick an operating point for shortened / int8 embeddings.
+
+Starts from the full-precision catalog (text-embedding-3-large, 3072 dims),
+derives every (dimensions, quantization) variant by truncating and
+re-normalizing (what the API returns for `dimensions=`), and compares each
+variant's top-k against the full-precision top-k:
+
+    overlap@k   share of the baseline top-k the variant also returns
+    recall@1/k  against labeled product_ids (only with --queries)
+    bytes/vec   catalog storage per product
+    search_ms   exact NumPy search over the whole catalog, per query
+
+    py bench/embedding_precision_bench.py --collection product_descriptions \
+        --queries bench/labeled_queries.example.jsonl
+
+    # no Chroma / OpenAI: synthetic catalog, queries = noisy catalog rows
+    py bench/embedding_precision_bench.py --synthetic 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from quantization import int8_dot, l2_normalize, quantize_int8, truncate_dims  # noqa: E402
+
+DEFAULT_DIMS = "3072,1536,1024,512,256"
+
+
+def load_collection(name: str):
+    from product_indexer import chroma_client
+
+    collection = chroma_client().get_collection(name)
+    vecs, metas, offset = [], [], 0
+    while True:
+        page = collection.get(include=["embeddings", "metadatas"], limit=1000, offset=offset)
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        vecs.append(np.asarray(page["embeddings"], dtype=np.float32))
+        metas.extend(page.get("metadatas") or [{}] * len(ids))
+        offset += len(ids)
+    pids = [str((m or {}).get("product_id")) for m in metas]
+    return l2_normalize(np.vstack(vecs)), pids
+
+
+def embed_labeled(path: str):
+    from embedders import OpenAIEmbedder
+
+    with open(path, encoding="utf-8") as f:
+        labeled = [json.loads(line) for line in f if line.strip()]
+    # full dims once; shorter variants are truncations of these
+    qvecs = OpenAIEmbedder(os.getenv("EMBED_MODEL", "text-embedding-3-large")).embed(
+        [item["query"] for item in labeled])
+    return l2_normalize(qvecs), [str(item["product_id"]) for item in labeled]
+
+
+def synthetic(n_items: int, n_queries: int, dim: int, seed: int = 0):
+    # low-rank structure so truncation behaves roughly like real embeddings
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((256, dim)).astype(np.float32)
+    basis *= np.linspace(1.0, 0.2, dim, dtype=np.float32)  # energy front-loaded (Matryoshka-ish)
+    catalog = l2_normalize(rng.standard_normal((n_items, 256)).astype(np.float32) @ basis)
+    picks = rng.integers(0, n_items, n_queries)
+    queries = l2_normalize(catalog[picks] + 0.03 * rng.standard_normal((n_queries, dim)).astype(np.float32))
+    return catalog, [str(i) for i in range(n_items)], queries, [str(i) for i in picks]
+
+
+def top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def evaluate(catalog, queries, dims, mode, k, baseline, pids=None, labels=None):
+    cat = truncate_dims(catalog, dims)
+    q = truncate_dims(queries, dims)
+    if mode == "int8":
+        codes, scales = quantize_int8(cat)
+        nbytes = codes.nbytes + scales.nbytes
+        t0 = time.perf_counter()
+        sims = int8_dot(codes, scales, q)
+    else:
+        cat = np.ascontiguousarray(cat)
+        nbytes = cat.nbytes
+        t0 = time.perf_counter()
+        sims = q @ cat.T
+    ranked = top_k(sims, k)
+    elapsed = time.perf_counter() - t0
+
+    overlap = np.mean([len(set(r) & set(b)) / k for r, b in zip(ranked, baseline)])
+    row = {
+        "dims": cat.shape[1],
+        "quantization": mode,
+        f"overlap@{k}": round(float(overlap), 4),
+        "top1_agree": round(float(np.mean(ranked[:, 0] == baseline[:, 0])), 4),
+        "bytes/vec": round(nbytes / len(cat), 1),
+        "catalog_mb": round(nbytes / 1e6, 2),
+        "search_ms": round(elapsed * 1000 / len(q), 3),
+    }
+    if labels is not None:
+        hit1 = hitk = 0
+        for r, expected in zip(ranked, labels):
+            got = [pids[i] for i in r]
+            hit1 += got[0] == expected
+            hitk += expected in got
+        row["recall@1"] = round(hit1 / len(labels), 3)
+        row[f"recall@{k}"] = round(hitk / len(labels), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="product_descriptions",
+                        help="full-precision collection (3072 dims)")
+    parser.add_argument("--queries", help="labeled JSONL ({query, product_id}); "
+                                          "default: catalog rows as queries")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N_ITEMS")
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--dims", default=DEFAULT_DIMS)
+    parser.add_argument("-k", type=int, default=8)
+    args = parser.parse_args()
+
+    labels = None
+    if args.synthetic:
+        catalog, pids, queries, labels = synthetic(args.synthetic, args.n_queries, 3072)
+    else:
+        catalog, pids = load_collection(args.collection)
+        if args.queries:
+            queries, labels = embed_labeled(args.queries)
+        else:
+            rng = np.random.default_rng(0)
+            queries = catalog[rng.choice(len(catalog), min(args.n_queries, len(catalog)),
+                                         replace=False)]
+
+    k = min(args.k, len(catalog))
+    baseline = top_k(queries @ catalog.T, k)
+    for dims in (int(d) for d in args.dims.split(",")):
+        if dims > catalog.shape[1]:
+            continue
+        for mode in ("none", "int8"):
+            print(json.dumps(evaluate(catalog, queries, dims, mode, k, baseline, pids, labels)),
+                  flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# bench/offline/fake_openai.py
+"""
+Local stand-in for the OpenAI API with configurable latency.
+
+    POST /v1/embeddings        deterministic feature-hashed vectors (so a query
+                               and a product sharing words are close), honours
+                               `dimensions` and encoding_format=base64
+    POST /v1/chat/completions  scripted ReAct turn: first call with tools →
+                               one `sql_db_query` tool call, once a tool result
+                               is present → a short Vietnamese answer.
+                               Supports stream=True (+ include_usage).
+
+    py bench/offline/fake_openai.py --port 5099 --chat-latency-ms 400 --embed-latency-ms 60
+
+Point clients at it with OPENAI_BASE_URL=http://127.0.0.1:5099/v1.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import re
+import time
+import uuid
+import zlib
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_DIM = 3072
+HASHES_PER_TOKEN = 8
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+app = FastAPI(title="Fake OpenAI")
+app.state.cfg = {
+    "chat_latency": 0.4,
+    "embed_latency": 0.06,
+    "token_latency": 0.0,
+    "sql": "SELECT id, name, price, inventory_qty FROM product ORDER BY inventory_qty LIMIT 5",
+}
+
+
+def _tokens(text: str) -> list[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    # words + character trigrams → typos / partial model names still overlap
+    grams = [w[i:i + 3] for w in words if len(w) > 3 for i in range(len(w) - 2)]
+    return words + grams
+
+
+def fake_embedding(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    vec = np.zeros(dim, dtype=np.float32)
+    for tok in _tokens(text):
+        h = zlib.crc32(tok.encode("utf-8"))
+        for k in range(HASHES_PER_TOKEN):
+            h = (h * 1103515245 + 12345) & 0x7FFFFFFF
+            vec[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _n_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"]
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    inputs = [x if isinstance(x, str) else " ".join(map(str, x)) for x in inputs]
+    dim = int(body.get("dimensions") or DEFAULT_DIM)
+    await asyncio.sleep(app.state.cfg["embed_latency"])
+
+    data = []
+    for i, text in enumerate(inputs):
+        vec = fake_embedding(text, dim)
+        if body.get("encoding_format") == "base64":
+            emb = base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii")
+        else:
+            emb = vec.tolist()
+        data.append({"object": "embedding", "index": i, "embedding": emb})
+    tokens = sum(_n_tokens(t) for t in inputs)
+    return {"object": "list", "data": data, "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+
+def _script(body: dict):
+    """(content, tool_calls) for this turn of the fake ReAct agent."""
+    messages = body.get("messages") or []
+    tool_names = [t["function"]["name"] for t in body.get("tools") or []]
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    tool_results = [m for m in messages[last_user + 1:] if m.get("role") == "tool"]
+
+    if "sql_db_query" in tool_names and not tool_results:
+        call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                "function": {"name": "sql_db_query",
+                             "arguments": json.dumps({"query": app.state.cfg["sql"]})}}
+        return None, [call]
+
+    preview = str(tool_results[-1].get("content", ""))[:200] if tool_results else ""
+    return f"Kết quả tra cứu: {preview}".strip(), None
+
+
+def _usage(body: dict, content: str | None) -> dict:
+    prompt = sum(_n_tokens(str(m.get("content") or "")) for m in body.get("messages") or [])
+    completion = _n_tokens(content or "x")
+    return {"prompt_tokens": prompt, "completion_tokens": completion,
+            "total_tokens": prompt + completion}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    cfg = app.state.cfg
+    content, tool_calls = _script(body)
+    usage = _usage(body, content)
+    cid, created, model = f"chatcmpl-{uuid.uuid4().hex}", int(time.time()), body.get("model")
+
+    if not body.get("stream"):
+        await asyncio.sleep(cfg["chat_latency"])
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {"id": cid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message,
+                             "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": usage}
+
+    def chunk(delta: dict, finish=None, usage_=None, choices=True) -> str:
+        out = {"id": cid, "object": "chat.completion.chunk", "created": created,
+               "model": model,
+               "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if choices else []}
+        if usage_:
+            out["usage"] = usage_
+        return f"data: {json.dumps(out, ensure_ascii=False)}\n\n"
+
+    async def stream():
+        await asyncio.sleep(cfg["chat_latency"])  # time to first token
+        yield chunk({"role": "assistant", "content": ""})
+        if tool_calls:
+            for i, call in enumerate(tool_calls):
+                yield chunk({"tool_calls": [{"index": i, **call}]})
+        else:
+            for word in content.split(" "):
+                if cfg["token_latency"]:
+                    await asyncio.sleep(cfg["token_latency"])
+                yield chunk({"content": word + " "})
+        yield chunk({}, finish="tool_calls" if tool_calls else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk({}, usage_=usage, choices=False)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--chat-latency-ms", type=float, default=400)
+    parser.add_argument("--embed-latency-ms", type=float, default=60)
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    parser.add_argument("--sql", default=None, help="query the fake agent runs")
+    args = parser.parse_args()
+
+    app.state.cfg.update({
+        "chat_latency": args.chat_latency_ms / 1000,
+        "embed_latency": args.embed_latency_ms / 1000,
+        "token_latency": args.token_latency_ms / 1000,
+    })
+    if args.sql:
+        app.state.cfg["sql"] = args.sql
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
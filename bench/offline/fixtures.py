@@ -0,0 +1,154 @@
+# bench/offline/fixtures.py
+"""
+Synthetic badminton-shop database (same tables the services query), for
+SQLite or a throwaway MySQL database.
+
+    from fixtures import seed
+    catalog = seed(create_engine("sqlite:///bench.db"), n_products=2000, n_orders=20000)
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+SCHEMA = [
+    "CREATE TABLE brand (id INTEGER PRIMARY KEY, name VARCHAR(100))",
+    "CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR(100))",
+    "CREATE TABLE status (id INTEGER PRIMARY KEY, description VARCHAR(100))",
+    "CREATE TABLE province (id INTEGER PRIMARY KEY, name VARCHAR(100))",
+    "CREATE TABLE ward (id INTEGER PRIMARY KEY, name VARCHAR(100), province_id INTEGER)",
+    "CREATE TABLE transport (id INTEGER PRIMARY KEY, province_id INTEGER, price INTEGER)",
+    "CREATE TABLE customer (id INTEGER PRIMARY KEY, name VARCHAR(255), email VARCHAR(255))",
+    """CREATE TABLE product (
+        id INTEGER PRIMARY KEY, name VARCHAR(255), price INTEGER,
+        discount_percentage INTEGER, inventory_qty INTEGER,
+        featured_image VARCHAR(255), description TEXT,
+        brand_id INTEGER, category_id INTEGER,
+        created_date DATETIME, updated_at DATETIME)""",
+    "CREATE TABLE image_item (id INTEGER PRIMARY KEY, product_id INTEGER, name VARCHAR(255))",
+    """CREATE TABLE `order` (
+        id INTEGER PRIMARY KEY, customer_id INTEGER, order_status_id INTEGER,
+        created_date DATETIME)""",
+    """CREATE TABLE order_item (
+        id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER, qty INTEGER,
+        unit_price INTEGER)""",
+    """CREATE TABLE comment (
+        id INTEGER PRIMARY KEY, product_id INTEGER, email VARCHAR(255),
+        star INTEGER, created_date DATETIME)""",
+    "CREATE INDEX idx_customer_email ON customer (email)",
+    "CREATE INDEX idx_order_customer ON `order` (customer_id)",
+    "CREATE INDEX idx_order_created ON `order` (created_date)",
+    "CREATE INDEX idx_order_item_order ON order_item (order_id)",
+    "CREATE INDEX idx_comment_product ON comment (product_id, created_date)",
+    "CREATE INDEX idx_product_inventory ON product (inventory_qty)",
+]
+
+BRANDS = {
+    "Yonex": ["Astrox", "Nanoflare", "Arcsaber", "Duora", "Voltric"],
+    "Victor": ["Thruster", "Auraspeed", "Jetspeed", "Brave Sword", "DriveX"],
+    "Lining": ["Axforce", "Halbertec", "Bladex", "Windstorm", "Aeronaut"],
+    "Mizuno": ["Fortius", "Altrax", "JPX", "Caliber", "Wave Fang"],
+    "Kumpoo": ["Power Control", "K520", "Tyrant", "Bow", "Nano"],
+    "Apacs": ["Feather Weight", "Z Ziggler", "Nano Fusion", "Stardom", "Virtuoso"],
+}
+CATEGORIES = ["Vợt cầu lông", "Giày cầu lông", "Áo cầu lông", "Quần cầu lông",
+              "Túi vợt", "Balo cầu lông", "Cước đan vợt", "Quả cầu lông", "Quấn cán"]
+MODELS = ["88D", "88S", "100ZZ", "77", "99 Pro", "7000", "800", "Play", "Game", "Tour"]
+STATUSES = ["Đã đặt hàng", "Đã xác nhận", "Đang giao hàng", "Đã giao hàng", "Đã hủy"]
+PROVINCES = ["TP. Hồ Chí Minh", "Hà Nội", "Đà Nẵng", "Cần Thơ", "Hải Phòng"]
+
+BATCH = 5000
+
+
+def _insert(conn, sql, rows):
+    for i in range(0, len(rows), BATCH):
+        conn.execute(text(sql), rows[i:i + BATCH])
+
+
+def product_rows(n_products: int, rnd: random.Random, now: datetime) -> list[dict]:
+    brands = list(BRANDS)
+    rows, seen = [], set()
+    for pid in range(1, n_products + 1):
+        brand_id = rnd.randrange(len(brands)) + 1
+        brand = brands[brand_id - 1]
+        category_id = rnd.randrange(len(CATEGORIES)) + 1
+        name = f"{CATEGORIES[category_id - 1]} {brand} {rnd.choice(BRANDS[brand])} {rnd.choice(MODELS)}"
+        if name in seen:
+            name = f"{name} ({pid})"  # names are unique in the real shop too
+        seen.add(name)
+        created = now - timedelta(days=rnd.randint(30, 720))
+        rows.append({
+            "id": pid, "name": name,
+            "price": rnd.randint(2, 60) * 50_000,
+            "discount_percentage": rnd.choice((0, 0, 0, 5, 10, 15, 20)),
+            "inventory_qty": int(rnd.expovariate(1 / 40)),
+            "featured_image": f"product-{pid}.jpg",
+            "description": f"<p>{name} chính hãng {brand}, phù hợp người chơi "
+                           f"{rnd.choice(['phong trào', 'trung bình', 'chuyên nghiệp'])}.</p>",
+            "brand_id": brand_id, "category_id": category_id,
+            "created_date": created, "updated_at": created,
+        })
+    return rows
+
+
+def seed(engine, n_products: int = 2000, n_orders: int = 20000, n_customers: int = 2000,
+         days: int = 180, seed_: int = 42) -> list[dict]:
+    """(Re)create every table and fill it; returns the product rows."""
+    rnd = random.Random(seed_)
+    now = datetime.now()
+
+    def ts():
+        return now - timedelta(seconds=rnd.randint(0, days * 86400))
+
+    t0 = time.perf_counter()
+    products = product_rows(n_products, rnd, now)
+    with engine.begin() as conn:
+        for table in ("comment", "order_item", "`order`", "image_item", "product", "customer",
+                      "transport", "ward", "province", "status", "category", "brand"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        for stmt in SCHEMA:
+            conn.execute(text(stmt))
+
+        _insert(conn, "INSERT INTO brand VALUES (:id, :name)",
+                [{"id": i, "name": b} for i, b in enumerate(BRANDS, 1)])
+        _insert(conn, "INSERT INTO category VALUES (:id, :name)",
+                [{"id": i, "name": c} for i, c in enumerate(CATEGORIES, 1)])
+        _insert(conn, "INSERT INTO status VALUES (:id, :d)",
+                [{"id": i, "d": s} for i, s in enumerate(STATUSES, 1)])
+        _insert(conn, "INSERT INTO province VALUES (:id, :name)",
+                [{"id": i, "name": p} for i, p in enumerate(PROVINCES, 1)])
+        _insert(conn, "INSERT INTO ward VALUES (:id, :name, :p)",
+                [{"id": i, "name": f"Phường {i}", "p": (i % len(PROVINCES)) + 1}
+                 for i in range(1, 51)])
+        _insert(conn, "INSERT INTO transport VALUES (:id, :p, :price)",
+                [{"id": i, "p": i, "price": 30_000 + 5_000 * i}
+                 for i in range(1, len(PROVINCES) + 1)])
+        _insert(conn, "INSERT INTO customer VALUES (:id, :name, :email)",
+                [{"id": i, "name": f"Khách {i}", "email": f"customer{i}@example.com"}
+                 for i in range(1, n_customers + 1)])
+        _insert(conn, """INSERT INTO product VALUES (
+                    :id, :name, :price, :discount_percentage, :inventory_qty,
+                    :featured_image, :description, :brand_id, :category_id,
+                    :created_date, :updated_at)""", products)
+        _insert(conn, "INSERT INTO image_item VALUES (:id, :p, :name)",
+                [{"id": p["id"], "p": p["id"], "name": p["featured_image"]} for p in products])
+        _insert(conn, "INSERT INTO `order` VALUES (:id, :c, :s, :ts)",
+                [{"id": i, "c": rnd.randint(1, n_customers), "s": rnd.randint(1, len(STATUSES)),
+                  "ts": ts()} for i in range(1, n_orders + 1)])
+        items, item_id = [], 0
+        for order_id in range(1, n_orders + 1):
+            for _ in range(rnd.randint(1, 3)):
+                item_id += 1
+                p = products[rnd.randrange(n_products)]
+                items.append({"id": item_id, "o": order_id, "p": p["id"],
+                              "q": rnd.randint(1, 3), "u": p["price"]})
+        _insert(conn, "INSERT INTO order_item VALUES (:id, :o, :p, :q, :u)", items)
+        _insert(conn, "INSERT INTO comment VALUES (:id, :p, :e, :s, :ts)",
+                [{"id": i, "p": rnd.randint(1, n_products),
+                  "e": f"customer{rnd.randint(1, n_customers)}@example.com",
+                  "s": rnd.randint(3, 5), "ts": ts()} for i in range(1, n_products // 2 + 1)])
+
+    print(f"🌱 Seeded {n_products:,} products / {n_orders:,} orders / {item_id:,} items "
+          f"in {time.perf_counter() - t0:.1f}s", flush=True)
+    return products
@@ -0,0 +1,174 @@
+# bench/offline/memory_chroma.py
+"""
+In-memory stand-in for the parts of the Chroma client API the services use
+(get_or_create_collection / get / query / upsert / delete / count), with
+exact search. Like the real server, distances follow the collection's
+`hnsw:space` metadata and default to squared L2: "cosine" → 1 - cos,
+"ip" → 1 - dot.
+
+A collection can be pre-loaded from a seed file written by `dump()`:
+BENCH_CHROMA_SEED=/path/seed.npz (the collection name is stored inside).
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class MemoryCollection:
+    def __init__(self, name: str, metadata: dict | None = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.space = self.metadata.get("hnsw:space", "l2")
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._docs: list = []
+        self._metas: list = []
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            if not self._vecs.size:
+                self._vecs = np.zeros((0, vecs.shape[1]), dtype=np.float32)
+            new_rows = []
+            for i, id_ in enumerate(ids):
+                pos = self._pos.get(id_)
+                if pos is None:
+                    self._pos[id_] = len(self._ids)
+                    self._ids.append(id_)
+                    self._docs.append(documents[i])
+                    self._metas.append(metadatas[i])
+                    new_rows.append(vecs[i])
+                else:
+                    self._docs[pos], self._metas[pos] = documents[i], metadatas[i]
+                    self._vecs[pos] = vecs[i]
+            if new_rows:
+                self._vecs = np.vstack([self._vecs, np.asarray(new_rows)])
+
+    add = upsert
+
+    def delete(self, ids=None, **kwargs):
+        drop = set(ids or [])
+        with self._lock:
+            keep = [i for i, id_ in enumerate(self._ids) if id_ not in drop]
+            self._ids = [self._ids[i] for i in keep]
+            self._docs = [self._docs[i] for i in keep]
+            self._metas = [self._metas[i] for i in keep]
+            self._vecs = self._vecs[keep] if self._vecs.size else self._vecs
+            self._pos = {id_: i for i, id_ in enumerate(self._ids)}
+
+    def get(self, ids=None, include=None, limit=None, offset=0, **kwargs):
+        include = include or ["metadatas", "documents"]
+        with self._lock:
+            if ids is not None:
+                rows = [self._pos[i] for i in ids if i in self._pos]
+            else:
+                stop = None if limit is None else (offset or 0) + limit
+                rows = list(range(len(self._ids)))[offset or 0:stop]
+            out = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                out["documents"] = [self._docs[r] for r in rows]
+            if "metadatas" in include:
+                out["metadatas"] = [self._metas[r] for r in rows]
+            if "embeddings" in include:
+                out["embeddings"] = self._vecs[rows] if rows else np.zeros((0, 0))
+        return out
+
+    def query(self, query_embeddings, n_results: int = 10, include=None, **kwargs):
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            vecs, ids, docs, metas = self._vecs, self._ids, self._docs, self._metas
+        out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not len(ids):
+            for k in out:
+                out[k] = [[] for _ in q]
+            return out
+        if self.space == "cosine":
+            qn = q / np.clip(np.linalg.norm(q, axis=1, keepdims=True), 1e-12, None)
+            vn = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+            dists = 1 - qn @ vn.T
+        elif self.space == "ip":
+            dists = 1 - q @ vecs.T
+        else:
+            # squared L2, like Chroma's default space
+            dists = ((q ** 2).sum(axis=1)[:, None] + (vecs ** 2).sum(axis=1)[None, :]
+                     - 2 * q @ vecs.T)
+        k = min(n_results, len(ids))
+        for row in dists:
+            top = np.argpartition(row, k - 1)[:k]
+            top = top[np.argsort(row[top])]
+            out["ids"].append([ids[i] for i in top])
+            out["documents"].append([docs[i] for i in top])
+            out["metadatas"].append([metas[i] for i in top])
+            out["distances"].append([float(row[i]) for i in top])
+        return out
+
+
+class MemoryClient:
+    """Drop-in for chromadb.HttpClient(host=..., port=...) within one process."""
+
+    _collections: dict[str, MemoryCollection] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        seed = os.getenv("BENCH_CHROMA_SEED")
+        if seed and os.path.exists(seed):
+            with self._lock:
+                name = load_name(seed)
+                if name not in self._collections:
+                    self._collections[name] = load(seed)
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None, **kwargs):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name, metadata)
+            return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs):
+        return self._collections[name]
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+
+def dump(collection: MemoryCollection, path: str):
+    with collection._lock:
+        np.savez(
+            path,
+            embeddings=collection._vecs,
+            header=np.frombuffer(json.dumps({
+                "name": collection.name,
+                "metadata": collection.metadata,
+                "ids": collection._ids,
+                "documents": collection._docs,
+                "metadatas": collection._metas,
+            }, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+        )
+
+
+def _header(data) -> dict:
+    return json.loads(data["header"].tobytes().decode("utf-8"))
+
+
+def load_name(path: str) -> str:
+    with np.load(path) as data:
+        return _header(data)["name"]
+
+
+def load(path: str) -> MemoryCollection:
+    with np.load(path) as data:
+        header = _header(data)
+        collection = MemoryCollection(header["name"], header.get("metadata"))
+        if header["ids"]:
+            collection.upsert(header["ids"], data["embeddings"],
+                              header["documents"], header["metadatas"])
+    return collection
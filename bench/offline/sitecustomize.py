@@ -0,0 +1,22 @@
+# bench/offline/sitecustomize.py
+"""
+Loaded automatically by Python when bench/offline is on PYTHONPATH
+(offline_bench.py does this for the servers it starts). With BENCH_OFFLINE=1:
+
+- chromadb.HttpClient → in-memory MemoryClient (seeded from BENCH_CHROMA_SEED)
+
+OpenAI, MySQL and the LangChain hub need no patching: OPENAI_BASE_URL points
+at fake_openai.py, DATABASE_URL at the SQLite fixture, and HUB_OFFLINE=1 makes
+hub_prompt.py use the vendored prompt.
+"""
+import os
+
+if os.getenv("BENCH_OFFLINE") == "1":
+    try:
+        import chromadb
+
+        from memory_chroma import MemoryClient
+
+        chromadb.HttpClient = MemoryClient
+    except ImportError:
+        pass  # service doesn't use Chroma in this environment
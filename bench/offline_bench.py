@@ -0,0 +1,308 @@
+# bench/offline_bench.py
+"""
+Offline load benchmark: no OpenAI, no remote Chroma, no production MySQL.
+
+Starts local stand-ins and the real services, then drives them at fixed
+concurrency levels and reports throughput and p50/p95/p99 latency.
+
+  - bench/offline/fake_openai.py   embeddings + chat (ReAct tool call → answer)
+                                   with configurable latency
+  - bench/offline/fixtures.py      synthetic badminton catalog (SQLite by default)
+  - bench/offline/memory_chroma.py in-memory collection, filled by the real
+                                   product_indexer.sync_products pipeline
+  - bench/offline/sitecustomize.py swaps chromadb.HttpClient inside the
+                                   service processes (BENCH_OFFLINE=1)
+
+    py bench/offline_bench.py                                   # match,sql,sale @ 1,8,32
+    py bench/offline_bench.py --targets match --concurrency 1,16,64 --duration 30
+    py bench/offline_bench.py --targets sale --sale-app sale_analysis:app   # LLM analyst
+    py bench/offline_bench.py --db-url mysql+pymysql://u:p@127.0.0.1/bench  # THROWAWAY db
+    py bench/offline_bench.py --chat-latency-ms 800 --embed-latency-ms 100 --workers 2
+
+Extra service settings pass straight through the environment, e.g.
+VECTOR_BACKEND=local py bench/offline_bench.py --targets match
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+from sqlalchemy import create_engine
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+OFFLINE = os.path.join(ROOT, "bench", "offline")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, OFFLINE)
+
+from fixtures import BRANDS, seed  # noqa: E402
+
+SQL_QUESTIONS = [
+    "Sản phẩm nào còn ít hàng nhất?",
+    "Top 5 sản phẩm bán chạy nhất tháng này là gì?",
+    "Giá trung bình của vợt Yonex là bao nhiêu?",
+    "Có bao nhiêu đơn hàng đã giao trong tuần qua?",
+    "Sản phẩm nào đang giảm giá nhiều nhất?",
+    "Vợt nào được bình luận nhiều nhất?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def match_queries(products: list, rnd: random.Random, n: int = 500) -> list[str]:
+    out = []
+    for p in rnd.sample(products, min(n, len(products))):
+        words = p["name"].split()
+        brand_at = next(i for i, w in enumerate(words) if w in BRANDS)
+        style = rnd.randrange(3)
+        if style == 0:
+            out.append(p["name"].lower())
+        elif style == 1:
+            out.append(" ".join(words[brand_at:]).lower())  # "yonex astrox 88d"
+        else:
+            out.append(f"tư vấn giúp mình {' '.join(words[brand_at:])} còn hàng không")
+    return out
+
+
+# ==================================================
+# PROCESSES
+# ==================================================
+def start(name: str, cmd: list, env: dict, workdir: str):
+    log = open(os.path.join(workdir, f"{name}.log"), "w")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    proc.log_path = log.name
+    return proc
+
+
+def wait_ready(proc, url: str, timeout: float):
+    import urllib.request
+
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            with open(proc.log_path, encoding="utf-8", errors="replace") as f:
+                tail = f.read()[-3000:]
+            raise RuntimeError(f"{url} exited with {proc.returncode}:\n{tail}")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return time.perf_counter() - t0
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s (see {proc.log_path})")
+
+
+def build_chroma_seed(engine, openai_base: str, path: str, collection_name: str):
+    """Embed the fixture catalog through the real sync pipeline into a seed file."""
+    from embedders import OpenAIEmbedder
+    from memory_chroma import MemoryCollection, dump
+    from product_indexer import sync_products
+
+    embedder = OpenAIEmbedder(os.getenv("EMBED_MODEL", "text-embedding-3-large"),
+                              api_key="bench")
+    embedder.client = embedder.client.with_options(base_url=openai_base)
+    collection = MemoryCollection(collection_name)  # default space, like chroma/ (L2)
+    sync_products(collection, engine, embedder, batch_size=256, concurrency=4)
+    dump(collection, path)
+
+
+# ==================================================
+# LOAD
+# ==================================================
+async def drive(make_request, concurrency: int, duration: float, warmup: int):
+    """Closed loop: `concurrency` workers send back-to-back requests for `duration` s."""
+    timeout = aiohttp.ClientTimeout(total=300)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        for _ in range(warmup):
+            await make_request(session)
+
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    ok = await make_request(session)
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+
+    lat = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "p99_ms": round(float(np.percentile(lat, 99)), 1),
+        "mean_ms": round(float(lat.mean()), 1),
+    }
+
+
+def request_factories(args, gateway: str, sale_url: str, products: list):
+    rnd = random.Random(7)
+    queries = match_queries(products, rnd)
+
+    async def match(session):
+        async with session.get(f"{gateway}/match/match_product",
+                               params={"query": rnd.choice(queries)}) as resp:
+            await resp.read()
+            return resp.status == 200
+
+    async def sql(session):
+        async with session.post(f"{gateway}/sql/sql",
+                                json={"query": rnd.choice(SQL_QUESTIONS)}) as resp:
+            await resp.read()
+            return resp.status == 200
+
+    async def sale(session):
+        body = {"window_days": rnd.choice((7, 30, 90)),
+                "high_stock_threshold": 30, "low_stock_threshold": 5}
+        async with session.post(f"{sale_url}/sale-analysis", json=body) as resp:
+            await resp.read()
+            return resp.status == 200
+
+    return {"match": match, "sql": sql, "sale": sale}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="match,sql,sale")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--db-url", default=None, help="default: SQLite in --workdir")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench", ".offline"))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per service")
+    parser.add_argument("--sale-app", default="sale_anal_noloop:app",
+                        help="rule-based (default) or sale_analysis:app (LLM agent)")
+    parser.add_argument("--chat-latency-ms", type=float, default=400)
+    parser.add_argument("--embed-latency-ms", type=float, default=60)
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="leave embedding/answer caches on (default: TTL 0)")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--out", help="append JSON results here")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    os.makedirs(args.workdir, exist_ok=True)
+
+    db_url = args.db_url or f"sqlite:///{os.path.join(args.workdir, 'bench.db')}"
+    engine = create_engine(db_url)
+    products = seed(engine, n_products=args.products, n_orders=args.orders)
+
+    procs = []
+    try:
+        oa_port = free_port()
+        openai_base = f"http://127.0.0.1:{oa_port}/v1"
+        procs.append(start("fake_openai", [
+            sys.executable, os.path.join(OFFLINE, "fake_openai.py"), "--port", str(oa_port),
+            "--chat-latency-ms", str(args.chat_latency_ms),
+            "--embed-latency-ms", str(args.embed_latency_ms),
+            "--token-latency-ms", str(args.token_latency_ms),
+        ], dict(os.environ), args.workdir))
+        wait_ready(procs[-1], f"http://127.0.0.1:{oa_port}/docs", args.startup_timeout)
+
+        collection_name = os.getenv("PRODUCT_COLLECTION", "product_descriptions")
+        seed_path = os.path.join(args.workdir, "chroma_seed.npz")
+        if "match" in targets:
+            build_chroma_seed(engine, openai_base, seed_path, collection_name)
+
+        env = dict(os.environ)
+        env.update({
+            "BENCH_OFFLINE": "1",
+            "PYTHONPATH": os.pathsep.join([OFFLINE, ROOT, env.get("PYTHONPATH", "")]),
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": openai_base,
+            "OPENAI_API_BASE": openai_base,
+            "DATABASE_URL": db_url,
+            "CHROMA_URL": "http://memory:0",
+            "HUB_OFFLINE": "1",
+            "BENCH_CHROMA_SEED": seed_path,
+            "PRODUCT_COLLECTION": collection_name,
+            "FRONTEND_URL_NEXT": env.get("FRONTEND_URL_NEXT", "http://shop.local"),
+            "IMAGE_BASE_URL": env.get("IMAGE_BASE_URL", "http://shop.local/images"),
+            "LOG_SAMPLE_RATE": env.get("LOG_SAMPLE_RATE", "0"),
+        })
+        if not args.keep_caches:
+            env.update({"EMBED_CACHE_TTL": "0", "ANSWER_CACHE_TTL": "0"})
+
+        uvicorn = [sys.executable, "-m", "uvicorn", "--host", "127.0.0.1",
+                   "--workers", str(args.workers), "--log-level", "warning"]
+        gateway = sale_url = None
+        if {"match", "sql"} & set(targets):
+            port = free_port()
+            gateway = f"http://127.0.0.1:{port}"
+            procs.append(start("gateway", uvicorn + ["main_api:main", "--port", str(port)],
+                               env, args.workdir))
+            print(f"🚀 gateway up in {wait_ready(procs[-1], gateway + '/docs', args.startup_timeout):.1f}s")
+            # lazy schema / agent / catalog: let the warm-up finish before measuring
+            ready = "/ready" if {"match", "sql"} <= set(targets) else \
+                f"/ready?only={'match' if 'match' in targets else 'sql'}"
+            try:
+                print(f"🔥 gateway warm in {wait_ready(procs[-1], gateway + ready, args.startup_timeout):.1f}s")
+            except RuntimeError as e:
+                print(f"⚠️ {e}")
+        if "sale" in targets:
+            port = free_port()
+            sale_url = f"http://127.0.0.1:{port}"
+            procs.append(start("sale", uvicorn + [args.sale_app, "--port", str(port)],
+                               env, args.workdir))
+            print(f"🚀 {args.sale_app} ready in "
+                  f"{wait_ready(procs[-1], sale_url + '/docs', args.startup_timeout):.1f}s")
+
+        factories = request_factories(args, gateway, sale_url, products)
+        results = []
+        print(f"{'target':<8}{'conc':>6}{'req':>8}{'err':>6}{'rps':>9}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}")
+        for target in targets:
+            for level in levels:
+                row = asyncio.run(drive(factories[target], level, args.duration, args.warmup))
+                row["target"] = target
+                results.append(row)
+                print(f"{target:<8}{level:>6}{row['requests']:>8}{row['errors']:>6}"
+                      f"{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}",
+                      flush=True)
+
+        if args.out:
+            config = {k: v for k, v in vars(args).items() if k != "out"}
+            with open(args.out, "a", encoding="utf-8") as f:
+                for row in results:
+                    f.write(json.dumps({**config, **row}, ensure_ascii=False) + "\n")
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# bench/sale_analysis_bench.py
+"""
+Benchmark the rule-based /sale-analysis query on a synthetic catalog.
+
+Compares the old approach (two `product` scans + per-row Python loop,
+no sales/comment data) with the single-pass SALE_ANALYSIS_SQL.
+
+    # SQLite file in bench/.offline/ (default, gitignored; several GB) –
+    # seeds 1M products / 10M order items once
+    py bench/sale_analysis_bench.py
+
+    # any MySQL-compatible server (use a THROWAWAY database!)
+    py bench/sale_analysis_bench.py --db-url mysql+pymysql://u:p@127.0.0.1/bench
+
+Seeding is skipped when the product table already has the requested size.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "bench-not-used")  # LLM is never called
+
+from sale_anal_noloop import SALE_ANALYSIS_SQL, decide_discount_and_reason  # noqa: E402
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS product (
+        id INTEGER PRIMARY KEY, name VARCHAR(255), price INTEGER,
+        discount_percentage INTEGER, inventory_qty INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS `order` (
+        id INTEGER PRIMARY KEY, customer_id INTEGER, created_date DATETIME)""",
+    """CREATE TABLE IF NOT EXISTS order_item (
+        id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER, qty INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS comment (
+        id INTEGER PRIMARY KEY, product_id INTEGER, created_date DATETIME)""",
+    "CREATE INDEX idx_product_inventory ON product (inventory_qty)",
+    "CREATE INDEX idx_order_created ON `order` (created_date)",
+    "CREATE INDEX idx_order_item_order ON order_item (order_id)",
+    "CREATE INDEX idx_comment_product ON comment (product_id, created_date)",
+]
+
+BATCH = 50_000
+
+
+def _insert(conn, sql, rows):
+    for i in range(0, len(rows), BATCH):
+        conn.execute(text(sql), rows[i:i + BATCH])
+
+
+def seed(engine, n_products: int, n_items: int, days: int = 180):
+    rnd = random.Random(42)
+    now = datetime.now()
+    n_orders = max(1, n_items // 3)
+    n_comments = n_products // 2
+
+    with engine.begin() as conn:
+        for stmt in SCHEMA:
+            try:
+                conn.execute(text(stmt))
+            except Exception:
+                pass  # index already exists
+        count = conn.execute(text("SELECT COUNT(*) FROM product")).scalar()
+        if count == n_products:
+            print(f"↩️  Reusing seeded data ({count:,} products)")
+            return
+        for table in ("comment", "order_item", "`order`", "product"):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+    def ts():
+        return (now - timedelta(seconds=rnd.randint(0, days * 86400))).strftime(
+            "%Y-%m-%d %H:%M:%S")
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        _insert(conn, "INSERT INTO product VALUES (:id, :name, :price, :d, :inv)", [
+            {"id": i, "name": f"Vợt cầu lông #{i}", "price": rnd.randint(1, 50) * 100_000,
+             "d": rnd.choice((0, 0, 5, 10, 30)), "inv": int(rnd.expovariate(1 / 40))}
+            for i in range(1, n_products + 1)])
+        _insert(conn, "INSERT INTO `order` VALUES (:id, :c, :ts)", [
+            {"id": i, "c": rnd.randint(1, 100_000), "ts": ts()}
+            for i in range(1, n_orders + 1)])
+        # generated in chunks to keep seeding memory flat for 10M rows
+        for start in range(1, n_items + 1, BATCH * 10):
+            stop = min(start + BATCH * 10, n_items + 1)
+            _insert(conn, "INSERT INTO order_item VALUES (:id, :o, :p, :q)", [
+                {"id": i, "o": rnd.randint(1, n_orders),
+                 "p": rnd.randint(1, n_products), "q": rnd.randint(1, 3)}
+                for i in range(start, stop)])
+        _insert(conn, "INSERT INTO comment VALUES (:id, :p, :ts)", [
+            {"id": i, "p": rnd.randint(1, n_products), "ts": ts()}
+            for i in range(1, n_comments + 1)])
+    print(f"🌱 Seeded {n_products:,} products / {n_items:,} order items "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+
+def run_legacy(engine, high, low):
+    with engine.connect() as conn:
+        slow = conn.execute(text("""
+            SELECT id, name, inventory_qty FROM product
+            WHERE inventory_qty >= :high AND inventory_qty > :low
+        """), {"high": high, "low": low}).fetchall()
+        near = conn.execute(text("""
+            SELECT id, name, inventory_qty FROM product
+            WHERE inventory_qty <= :low
+        """), {"low": low}).fetchall()
+    out = []
+    for r in list(slow) + list(near):
+        p = dict(r._mapping)
+        p["recommended_discount"], p["reason"] = decide_discount_and_reason(
+            p["inventory_qty"], high, low)
+        out.append(p)
+    return out
+
+
+def run_single_pass(engine, window_days, high, low):
+    since = datetime.now() - timedelta(days=window_days)
+    with engine.connect() as conn:
+        rows = conn.execute(SALE_ANALYSIS_SQL,
+                            {"high": high, "low": low, "since": since}).fetchall()
+    out = []
+    for r in rows:
+        p = dict(r._mapping)
+        p["recommended_discount"], p["reason"] = decide_discount_and_reason(
+            p["inventory_qty"], high, low)
+        out.append(p)
+    return out
+
+
+def timed(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="default: SQLite in --workdir")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench", ".offline"))
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--order-items", type=int, default=10_000_000)
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--high", type=int, default=30)
+    parser.add_argument("--low", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    db_url = args.db_url or f"sqlite:///{os.path.join(args.workdir, 'sale_analysis.db')}"
+    engine = create_engine(db_url)
+    seed(engine, args.products, args.order_items)
+
+    legacy_t, legacy = timed(lambda: run_legacy(engine, args.high, args.low), args.repeat)
+    single_t, single = timed(
+        lambda: run_single_pass(engine, args.window_days, args.high, args.low), args.repeat)
+
+    print(f"legacy (2 scans, no sales/comments): {legacy_t * 1000:9.1f} ms  rows={len(legacy):,}")
+    print(f"single pass (+ windowed joins)     : {single_t * 1000:9.1f} ms  rows={len(single):,}")
+
+
+if __name__ == "__main__":
+    main()
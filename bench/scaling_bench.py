@@ -0,0 +1,94 @@
+# bench/scaling_bench.py
+"""
+Multi-worker throughput scaling: runs offline_bench.py once per uvicorn
+worker count (fresh services each time) and prints rps per worker count
+with the speedup over the first one.
+
+Services share one SQLite cache file per run (SHARED_CACHE_URL) unless
+--no-shared-cache; add --keep-caches so the cache tier actually serves hits.
+
+    py bench/scaling_bench.py                                  # sql,match @ 1,2,4 workers
+    py bench/scaling_bench.py --workers 1,2,4,8 --targets match --concurrency 32,64
+    py bench/scaling_bench.py --keep-caches --duration 30      # shared-cache effect
+    py bench/scaling_bench.py --no-shared-cache                # per-worker caches only
+
+Any other option is passed straight to offline_bench.py. Speedup is bounded
+by the cores the services get (os.cpu_count() is printed with the results),
+and the load generator and fake OpenAI server run on the same host.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--targets", default="sql,match")
+    parser.add_argument("--concurrency", default="16,64")
+    parser.add_argument("--no-shared-cache", action="store_true")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench", ".offline"))
+    parser.add_argument("--out", help="append JSON results here")
+    args, passthrough = parser.parse_known_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results_path = os.path.join(args.workdir, "scaling_results.jsonl")
+    if os.path.exists(results_path):
+        os.remove(results_path)
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    for workers in worker_counts:
+        env = dict(os.environ)
+        if not args.no_shared_cache:
+            cache_path = os.path.join(os.path.abspath(args.workdir), f"shared_{workers}.sqlite")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(cache_path + suffix):
+                    os.remove(cache_path + suffix)
+            env["SHARED_CACHE_URL"] = "sqlite:///" + cache_path
+        print(f"\n===== {workers} worker(s) =====", flush=True)
+        subprocess.run([
+            sys.executable, os.path.join(ROOT, "bench", "offline_bench.py"),
+            "--workers", str(workers), "--targets", args.targets,
+            "--concurrency", args.concurrency, "--workdir", args.workdir,
+            "--out", results_path, *passthrough,
+        ], env=env, check=True)
+
+    rps = defaultdict(dict)  # (target, concurrency) → {workers: row}
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            rps[(row["target"], row["concurrency"])][row["workers"]] = row
+
+    base = worker_counts[0]
+    print(f"\nThroughput scaling (cpu_count={os.cpu_count()}, "
+          f"shared cache={'off' if args.no_shared_cache else 'sqlite'})")
+    print(f"{'target':<8}{'conc':>6}" + "".join(f"{f'{w}w rps':>12}{'x':>7}" for w in worker_counts))
+    for (target, conc), by_workers in sorted(rps.items()):
+        line = f"{target:<8}{conc:>6}"
+        for w in worker_counts:
+            row = by_workers.get(w)
+            if row is None:
+                line += f"{'-':>12}{'':>7}"
+                continue
+            ref = by_workers.get(base, {}).get("rps") or 0
+            speedup = f"{row['rps'] / ref:.2f}" if ref else "-"
+            line += f"{row['rps']:>12}{speedup:>7}"
+        print(line)
+
+    if args.out:
+        with open(results_path, encoding="utf-8") as src, \
+                open(args.out, "a", encoding="utf-8") as dst:
+            for line in src:
+                row = json.loads(line)
+                row["shared_cache"] = not args.no_shared_cache
+                dst.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
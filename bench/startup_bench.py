@@ -0,0 +1,128 @@
+# bench/startup_bench.py
+"""
+Worker startup benchmark: how long until a fresh process can serve?
+
+For each run, in a fresh interpreter:
+  import   → `import <module>` time (everything that runs at import)
+  live     → spawn uvicorn → first 200 from --live-path (worker accepts traffic)
+  ready    → spawn uvicorn → first 200 from --ready-path (schema, agent and
+             catalog built by the lifespan warm-up; "-" if not within --ready-timeout)
+
+    py bench/startup_bench.py                                 # gateway, env as-is
+    py bench/startup_bench.py --offline                       # SQLite fixture, no network
+    py bench/startup_bench.py --app sale_anal_noloop:app --live-path /docs --ready-path ""
+    WARM_UP=0 py bench/startup_bench.py --offline             # lazy builds only
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from offline_bench import OFFLINE, ROOT, free_port, start, wait_ready
+
+
+def import_seconds(module: str, env: dict) -> float:
+    code = ("import time, importlib; t = time.perf_counter(); "
+            f"importlib.import_module({module!r}); print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{out.stderr[-3000:]}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def offline_env(workdir: str) -> dict:
+    """SQLite fixture + in-memory Chroma + vendored hub prompt: no network at all."""
+    from sqlalchemy import create_engine
+
+    sys.path.insert(0, OFFLINE)
+    from fixtures import seed
+
+    db_url = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    seed(create_engine(db_url), n_products=200, n_orders=500)
+    return {
+        "BENCH_OFFLINE": "1",
+        "PYTHONPATH": os.pathsep.join([OFFLINE, ROOT, os.getenv("PYTHONPATH", "")]),
+        "HUB_OFFLINE": "1",
+        "DATABASE_URL": db_url,
+        "CHROMA_URL": "http://memory:0",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",  # never called during startup
+        "LOG_SAMPLE_RATE": "0",
+    }
+
+
+def summarize(values: list) -> str:
+    if not values:
+        return "-"
+    arr = np.asarray(values) * 1000
+    return f"{np.median(arr):.0f} ms (min {arr.min():.0f}, max {arr.max():.0f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main_api:main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--live-path", default="/metrics")
+    parser.add_argument("--ready-path", default="/ready", help='"" to skip')
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench", ".offline"))
+    parser.add_argument("--out", help="append JSON results here")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    env = dict(os.environ)
+    if args.offline:
+        env.update(offline_env(args.workdir))
+    module = args.app.split(":")[0]
+
+    results = {"import": [], "live": [], "ready": []}
+    for run in range(args.runs):
+        results["import"].append(import_seconds(module, env))
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = start(f"startup_{run}", [
+            sys.executable, "-m", "uvicorn", args.app, "--host", "127.0.0.1",
+            "--port", str(port), "--log-level", "warning",
+        ], env, args.workdir)
+        try:
+            t0 = time.perf_counter()
+            wait_ready(proc, base + args.live_path, timeout=60)
+            results["live"].append(time.perf_counter() - t0)
+            if args.ready_path:
+                try:
+                    wait_ready(proc, base + args.ready_path, timeout=args.ready_timeout)
+                    results["ready"].append(time.perf_counter() - t0)
+                except RuntimeError as e:
+                    print(f"⚠️ run {run}: {e}", flush=True)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        print(f"run {run}: import {results['import'][-1] * 1000:.0f} ms, "
+              f"live {results['live'][-1] * 1000:.0f} ms", flush=True)
+
+    print(f"\n{args.app} over {args.runs} runs (median)")
+    for phase, values in results.items():
+        print(f"  {phase:<7}{summarize(values)}")
+
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"app": args.app, "offline": args.offline,
+                                "warm_up": env.get("WARM_UP", "1"),
+                                **{k: [round(v, 4) for v in vs] for k, vs in results.items()}})
+                    + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# concurrency.py
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# 🧵 Bounded pool for blocking work (PyMySQL, sync SDK calls) called from
+# async endpoints, so one slow query never freezes the uvicorn event loop.
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a sync function on the bounded pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        blocking_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,85 @@
+# db.py
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from metrics import instrument_engine
+
+# Load .env variables (DB_HOST, DB_USERNAME, DB_PASSWORD, DB_NAME)
+load_dotenv()
+
+# DATABASE_URL overrides the DB_* parts (e.g. sqlite:///bench.db for offline benchmarks)
+DATABASE_URL = os.getenv("DATABASE_URL") or (
+    f"mysql+pymysql://{os.getenv('DB_USERNAME')}:"
+    f"{os.getenv('DB_PASSWORD')}@"
+    f"{os.getenv('DB_HOST')}/"
+    f"{os.getenv('DB_NAME')}"
+)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Keep below MySQL wait_timeout so we never hand out a connection the server closed
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - t0
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+# 🔗 ONE shared, pooled engine for every sub-app mounted in main_api
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+instrument_engine(engine)  # billshop_sql_seconds on /metrics
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "recycle_seconds": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+    }
+    if isinstance(pool, TimedQueuePool):
+        count = pool.wait_count
+        stats.update({
+            "checkouts": count,
+            "wait_total_ms": round(pool.wait_total * 1000, 2),
+            "wait_avg_ms": round(pool.wait_total * 1000 / count, 3) if count else 0.0,
+            "wait_max_ms": round(pool.wait_max * 1000, 2),
+        })
+    return stats
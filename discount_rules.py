@@ -0,0 +1,134 @@
+# discount_rules.py
+import json
+import os
+
+import numpy as np
+
+# ==================================================
+# DISCOUNT RULE TABLE (LUẬT CỨNG – declarative)
+# Rules are checked top-down, first match wins (same as the if/elif ladder
+# in sale_anal_noloop.decide_discount_and_reason).
+#   field : "inventory_qty" or "ratio" (= inventory_qty / high)
+#   op    : "<=", "<", ">=", ">"
+#   value : number, or "low" / "high" → request thresholds
+# Override without code edits: DISCOUNT_RULES_PATH=/path/rules.json
+# with {"reasons": {...}, "rules": [...], "default": {...}}
+# ==================================================
+DEFAULT_REASONS = {
+    "NEAR_OUT": "Tồn kho bằng hoặc thấp hơn ngưỡng cho phép, sản phẩm sắp hoặc đã hết hàng nên không áp dụng giảm giá.",
+    "OVERSTOCK_3X": "Tồn kho gấp nhiều lần ngưỡng chuẩn, hàng quay vòng rất chậm nên cần giảm giá để giải phóng tồn kho.",
+    "OVERSTOCK_2X": "Tồn kho cao hơn mức an toàn trong thời gian dài, cần hỗ trợ giá để tăng tốc độ bán ra.",
+    "OVERSTOCK_1X": "Tồn kho vượt ngưỡng chuẩn, áp dụng giảm nhẹ để kích cầu và cải thiện tốc độ quay vòng.",
+    "SAFE": "Tồn kho đang ở mức an toàn, không cần áp dụng giảm giá.",
+}
+
+DEFAULT_RULES = [
+    {"field": "inventory_qty", "op": "<=", "value": "low", "discount": 0, "reason": "NEAR_OUT"},
+    {"field": "ratio", "op": ">=", "value": 3, "discount": 10, "reason": "OVERSTOCK_3X"},
+    {"field": "ratio", "op": ">=", "value": 2, "discount": 8, "reason": "OVERSTOCK_2X"},
+    {"field": "ratio", "op": ">=", "value": 1, "discount": 5, "reason": "OVERSTOCK_1X"},
+]
+
+DEFAULT_FALLBACK = {"discount": 0, "reason": "SAFE"}
+
+_OPS = {
+    "<=": np.less_equal,
+    "<": np.less,
+    ">=": np.greater_equal,
+    ">": np.greater,
+}
+
+
+class DiscountRuleEngine:
+    """Evaluates the rule table column-wise over NumPy arrays."""
+
+    def __init__(self, rules=None, reasons=None, default=None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        reasons = reasons if reasons is not None else DEFAULT_REASONS
+        self.default = default if default is not None else DEFAULT_FALLBACK
+
+        # reason strings interned once; rows only carry an int code
+        self.reason_keys = list(reasons)
+        self.reason_texts = [reasons[k] for k in self.reason_keys]
+        self._reason_index = {k: i for i, k in enumerate(self.reason_keys)}
+
+        if len(self.reason_keys) > 255:
+            raise ValueError("Too many reason codes (max 255)")
+        for rule in list(self.rules) + [self.default]:
+            if not 0 <= int(rule["discount"]) <= 100:
+                raise ValueError(f"Discount must be 0-100: {rule['discount']}")
+            if rule is self.default:
+                continue
+            if rule["field"] not in ("inventory_qty", "ratio"):
+                raise ValueError(f"Unsupported field in discount rule: {rule['field']}")
+            if rule["op"] not in _OPS:
+                raise ValueError(f"Unsupported op in discount rule: {rule['op']}")
+            if rule["reason"] not in self._reason_index:
+                raise ValueError(f"Unknown reason code in discount rule: {rule['reason']}")
+            value = rule["value"]
+            if isinstance(value, bool) or not (
+                    value in ("low", "high") or isinstance(value, (int, float))):
+                raise ValueError(f"Rule value must be a number, 'low' or 'high': {value!r}")
+        if self.default["reason"] not in self._reason_index:
+            raise ValueError(f"Unknown default reason code: {self.default['reason']}")
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            cfg = json.load(f)
+        return cls(cfg.get("rules"), cfg.get("reasons"), cfg.get("default"))
+
+    def evaluate(self, inventory_qty, high: int, low: int):
+        """
+        inventory_qty: 1-D array-like of ints.
+        Returns (discounts uint8[n], reason_codes uint8[n]).
+        high == 0 with a ratio rule raises ValueError (the per-row ladder
+        divided by zero there).
+        """
+        inv = np.asarray(inventory_qty, dtype=np.int64)
+        if high == 0 and any(rule["field"] == "ratio" for rule in self.rules):
+            raise ValueError("high threshold must be non-zero for ratio rules")
+        thresholds = {"low": low, "high": high}
+
+        discounts = np.full(inv.shape, self.default["discount"], dtype=np.uint8)
+        codes = np.full(
+            inv.shape, self._reason_index[self.default["reason"]], dtype=np.uint8)
+        tmp = np.empty(inv.shape, dtype=np.uint8)
+
+        # Walk rules bottom-up so earlier rules overwrite later ones (first
+        # match wins). `x -= (x - v) * cond` sets x = v where cond holds; in
+        # uint8 the wrap-around cancels out, and it is far cheaper than
+        # np.select / np.where with boolean masks.
+        # float64 inventory/high exactly like the ladder: `inv OP v*high` is not
+        # equivalent for decimal values (110/100 >= 1.1 but 110 < 1.1*100)
+        ratio = None
+        for rule in reversed(self.rules):
+            value = thresholds.get(rule["value"], rule["value"])
+            if rule["field"] == "ratio":
+                if ratio is None:
+                    ratio = inv / high
+                cond = _OPS[rule["op"]](ratio, value)
+            else:
+                cond = _OPS[rule["op"]](inv, value)
+            mask = cond.view(np.uint8)
+
+            for out, v in ((discounts, rule["discount"]),
+                           (codes, self._reason_index[rule["reason"]])):
+                np.subtract(out, np.uint8(v), out=tmp)
+                np.multiply(tmp, mask, out=tmp)
+                np.subtract(out, tmp, out=out)
+
+        return discounts, codes
+
+    def reason_key(self, code: int) -> str:
+        return self.reason_keys[code]
+
+    def reason_text(self, code: int) -> str:
+        return self.reason_texts[code]
+
+
+def load_engine() -> DiscountRuleEngine:
+    path = os.getenv("DISCOUNT_RULES_PATH")
+    if path:
+        return DiscountRuleEngine.from_file(path)
+    return DiscountRuleEngine()
@@ -0,0 +1,115 @@
+# embedders.py
+import os
+
+import numpy as np
+
+
+class OpenAIEmbedder:
+    """
+    OpenAI embeddings API (default: text-embedding-3-large, 3072 dims).
+    `dimensions` asks text-embedding-3-* for shortened vectors (e.g. 1024).
+    """
+
+    def __init__(self, model: str = "text-embedding-3-large", api_key: str | None = None,
+                 batch_size: int = 256, dimensions: int | None = None):
+        from openai import OpenAI
+        self.model = model
+        self.batch_size = batch_size
+        self.dimensions = dimensions
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+    @property
+    def name(self) -> str:
+        if self.dimensions:
+            return f"openai:{self.model}:{self.dimensions}"
+        return f"openai:{self.model}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dim) float32, in input order."""
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            chunk = texts[i:i + self.batch_size]
+            kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+            emb = self.client.embeddings.create(model=self.model, input=chunk, **kwargs)
+            # OpenAI keeps input order, but sort by index to be safe
+            out.extend(d.embedding for d in sorted(emb.data, key=lambda d: d.index))
+        return np.asarray(out, dtype=np.float32)
+
+
+class LocalONNXEmbedder:
+    """
+    CPU-only sentence embeddings from an ONNX export of a sentence-transformers
+    model (e.g. a quantized paraphrase-multilingual-MiniLM-L12-v2 for Vietnamese).
+
+    `model_dir` must contain `tokenizer.json` and `model.onnx`
+    (or `model_quantized.onnx`, preferred when present).
+    Needs: pip install onnxruntime tokenizers
+    """
+
+    def __init__(self, model_dir: str, batch_size: int = 64, max_length: int = 128,
+                 threads: int | None = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "Local embeddings need `pip install onnxruntime tokenizers`") from e
+
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        model_file = "model_quantized.onnx"
+        if not os.path.exists(os.path.join(model_dir, model_file)):
+            model_file = "model.onnx"
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def name(self) -> str:
+        return f"local:{os.path.basename(os.path.normpath(self.model_dir))}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            encs = self.tokenizer.encode_batch(texts[i:i + self.batch_size])
+            ids = np.asarray([e.ids for e in encs], dtype=np.int64)
+            mask = np.asarray([e.attention_mask for e in encs], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+            # mean pooling over real tokens + L2 normalize (sentence-transformers default)
+            m = mask[..., None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.append(pooled.astype(np.float32))
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(out)
+
+
+def get_embedder(kind: str | None = None, dimensions: int | None = None):
+    """
+    EMBEDDER=openai (default) | local (LOCAL_EMBED_MODEL_DIR).
+    EMBED_DIMENSIONS shortens OpenAI vectors; query and catalog must agree.
+    """
+    kind = (kind or os.getenv("EMBEDDER", "openai")).lower()
+    if kind == "local":
+        model_dir = os.getenv("LOCAL_EMBED_MODEL_DIR")
+        if not model_dir:
+            raise ValueError("EMBEDDER=local requires LOCAL_EMBED_MODEL_DIR")
+        return LocalONNXEmbedder(model_dir)
+    dims = dimensions or os.getenv("EMBED_DIMENSIONS")
+    return OpenAIEmbedder(
+        os.getenv("EMBED_MODEL", "text-embedding-3-large"),
+        dimensions=int(dims) if dims else None,
+    )
@@ -0,0 +1,127 @@
+# embedding_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from quantization import dequantize_int8, quantize_int8
+from shared_cache import remaining_ttl, safe_call, shared_key
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase + collapse whitespace (same rule match_product uses for names)."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    In-process LRU + TTL cache for query embeddings.
+    Key = (model, normalized query), value = float32 vector (3072 dims ≈ 12 KB),
+    or int8 codes + scale with quantization="int8" (≈ 3 KB).
+    With `shared` (see shared_cache.py) misses fall through to a cache shared by
+    all workers, and new vectors are written to both.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: float = 3600,
+                 quantization: str = "none", shared=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.quantization = quantization
+        self.shared = shared
+        self._data: "OrderedDict[tuple[str, str], tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model: str, text: str):
+        key = (model, normalize_query(text))
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and now - item[0] > self.ttl_seconds:
+                # ⏰ expired → drop and count as miss
+                del self._data[key]
+                self.evictions += 1
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+
+        if item is None:
+            vec, left = self._get_shared(key)
+            with self._lock:
+                if vec is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self.shared_hits += 1
+            # next time it's a local hit, until the shared copy would have expired
+            return self._store(key, vec, stored_at=now - (self.ttl_seconds - left))
+
+        stored = item[1]
+        if self.quantization == "int8":
+            codes, scale = stored
+            return dequantize_int8(codes[None, :], scale)[0]
+        return stored
+
+    def put(self, model: str, text: str, vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        vec.setflags(write=False)  # shared between requests → read-only
+        key = (model, normalize_query(text))
+        stored = self._store(key, vec)
+        if self.shared is not None and self.ttl_seconds >= 1:
+            safe_call(self.shared.set, shared_key("emb", *key), vec.tobytes(),
+                      ex=int(self.ttl_seconds))
+        return stored
+
+    def _get_shared(self, key):
+        """(vector, seconds it has left) from the shared tier, or (None, 0)."""
+        if self.shared is None:
+            return None, 0
+        skey = shared_key("emb", *key)
+        raw = safe_call(self.shared.get, skey)
+        if raw is None:
+            return None, 0
+        left = remaining_ttl(self.shared, skey, self.ttl_seconds)
+        return np.frombuffer(raw, dtype=np.float32), left  # read-only, like put()
+
+    def _store(self, key, vec: np.ndarray, stored_at: float | None = None) -> np.ndarray:
+        """Cache `vec`; returns exactly what a later get() will, so scores never
+        shift between the request that embedded a query and the ones that hit."""
+        stored = vec
+        if self.quantization == "int8":
+            codes, scales = quantize_int8(vec)
+            stored = (codes[0], scales)
+            vec = dequantize_int8(codes, scales)[0]
+            vec.setflags(write=False)
+        with self._lock:
+            self._data[key] = (time.monotonic() if stored_at is None else stored_at, stored)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return vec
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "quantization": self.quantization,
+            "shared": self.shared is not None,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,82 @@
+# hub_prompt.py
+import os
+
+# 📄 LangChain Hub prompts, cached on disk so workers start without network.
+# Lookup order: HUB_CACHE_DIR copy → hub.pull (saved to the cache) → vendored
+# copy in prompts/. HUB_OFFLINE=1 skips the network entirely.
+HUB_CACHE_DIR = os.getenv(
+    "HUB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "billshop", "hub"))
+HUB_OFFLINE = os.getenv("HUB_OFFLINE", "0") == "1"
+VENDORED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# hub name → vendored file (refresh with: py hub_prompt.py <name>)
+VENDORED = {
+    "langchain-ai/sql-agent-system-prompt": "sql_agent_system_prompt.txt",
+}
+
+
+def _cache_path(name: str) -> str:
+    return os.path.join(HUB_CACHE_DIR, name.replace("/", "__") + ".txt")
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def pull_template(name: str) -> str:
+    """Fetch from the hub and return the (first) message's template text."""
+    from langchain import hub
+
+    prompt = hub.pull(name)
+    if hasattr(prompt, "messages"):
+        prompt = prompt.messages[0].prompt
+    return prompt.template
+
+
+def save_template(name: str, template: str):
+    os.makedirs(HUB_CACHE_DIR, exist_ok=True)
+    tmp = _cache_path(name) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(template)
+    os.replace(tmp, _cache_path(name))  # atomic: parallel workers never see half a file
+
+
+def load_template(name: str) -> str:
+    template = _read(_cache_path(name))
+    if template is not None:
+        return template
+
+    if not HUB_OFFLINE:
+        try:
+            template = pull_template(name)
+            save_template(name, template)
+            return template
+        except Exception as e:
+            print(f"⚠️ hub.pull({name}) failed, using vendored copy: {e}", flush=True)
+
+    template = _read(os.path.join(VENDORED_DIR, VENDORED.get(name, "")))
+    if template is None:
+        raise FileNotFoundError(f"No cached or vendored copy of hub prompt {name}")
+    return template
+
+
+def load_hub_prompt(name: str, **variables) -> str:
+    """Template text for `name`, formatted with `variables` (e.g. dialect, top_k)."""
+    return load_template(name).format(**variables)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for prompt_name in sys.argv[1:] or list(VENDORED):
+        text_ = pull_template(prompt_name)
+        save_template(prompt_name, text_)
+        if prompt_name in VENDORED:
+            with open(os.path.join(VENDORED_DIR, VENDORED[prompt_name]), "w",
+                      encoding="utf-8") as f:
+                f.write(text_)
+        print(f"✅ {prompt_name}: {len(text_)} chars → {_cache_path(prompt_name)}")
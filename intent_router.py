@@ -0,0 +1,168 @@
+# intent_router.py
+import re
+
+from sqlalchemy import text
+
+from logs import get_logger
+from order_access import extract_order_ids, mentions_order
+
+log = get_logger("router")
+
+# ==================================================
+# FAST-PATH INTENTS
+# Common questions answered with one parameterized SELECT + a template,
+# no LLM involved. Anything that doesn't match falls through to the agent.
+# ==================================================
+
+# whole words only: "đánh giá" (review) and "giá trị" (value) are not price
+# questions, and a bare "bao nhiêu" is as often "how many left" as "how much"
+PRICE_RE = re.compile(r"(?<!đánh )\bgiá\b(?! trị)|\bbao nhiêu tiền\b|\bmấy tiền\b|\bprice\b")
+STOCK_WORDS = ("còn hàng", "hết hàng", "tồn kho", "còn không", "in stock", "stock")
+STATUS_WORDS = ("trạng thái", "tình trạng", "status", "đến đâu", "giao chưa")
+# with a focused product, price/stock questions about anything else (other
+# products, "cheaper ones", comparisons) must go to the agent
+COMPARE_RE = re.compile(r"\b(?:so sánh|hơn|nào|khác|compare|than|vs)\b")
+
+# list intents only for the bare listing question ("shop có những hãng nào?",
+# "danh sách thương hiệu"), not "vợt của hãng Yonex nào tốt nhất"
+_LIST_TAIL = r"(?:\s+(?:vậy|thế|ạ|shop|bên shop|ở shop|của shop|hiện nay|hiện tại))*\s*[?.!]*$"
+
+
+def _list_re(vi: str, en: str):
+    return re.compile(
+        rf"(?:(?:những|các|mấy)\s+(?:{vi})\s+(?:nào|gì)"
+        rf"|^(?:danh sách|list)\s+(?:các\s+|những\s+|all\s+|of\s+)?(?:{vi}|{en})"
+        rf"|^(?:what|which)\s+(?:{en})(?:\s+do you (?:have|sell|carry))?){_LIST_TAIL}")
+
+
+BRAND_LIST_RE = _list_re("hãng|thương hiệu", "brands")
+CATEGORY_LIST_RE = _list_re("danh mục|loại sản phẩm", "categories")
+
+SQL_ORDER_STATUS = text("""
+    SELECT o.id, s.description AS status
+    FROM `order` o
+    JOIN customer c ON o.customer_id = c.id
+    JOIN status s ON o.order_status_id = s.id
+    WHERE o.id = :order_id AND c.email = :email
+""")
+
+SQL_PRODUCT_PRICE = text("""
+    SELECT name, price, discount_percentage
+    FROM product
+    WHERE name = :name
+    LIMIT 1
+""")
+
+SQL_PRODUCT_STOCK = text("""
+    SELECT name, inventory_qty
+    FROM product
+    WHERE name = :name
+    LIMIT 1
+""")
+
+SQL_BRANDS = text("SELECT name FROM brand ORDER BY name")
+
+SQL_CATEGORIES = text("SELECT name FROM category ORDER BY name")
+
+
+def _has_any(text_: str, words) -> bool:
+    return any(w in text_ for w in words)
+
+
+def _names_other_product(query: str, top_product: str) -> bool:
+    """A model number or capitalized name that isn't part of `top_product`."""
+    own = set(top_product.lower().split())
+    for i, token in enumerate(re.findall(r"\w+", query)):
+        if token.lower() in own:
+            continue
+        if any(ch.isdigit() for ch in token) or (i > 0 and token[0].isupper()):
+            return True
+    return False
+
+
+def classify(query: str, email: str | None = None, top_product: str | None = None):
+    """Return (intent, params) for a fast-path intent, or None → use the agent."""
+    lowered = " ".join(query.lower().split())
+
+    if mentions_order(lowered):
+        ids = extract_order_ids(lowered)
+        if email and len(ids) == 1 and _has_any(lowered, STATUS_WORDS):
+            return "order_status", {"order_id": ids[0], "email": email}
+        return None
+
+    if top_product:
+        if COMPARE_RE.search(lowered) or _names_other_product(query, top_product):
+            return None
+        if _has_any(lowered, STOCK_WORDS):
+            return "product_stock", {"name": top_product}
+        if PRICE_RE.search(lowered):
+            return "product_price", {"name": top_product}
+        return None
+
+    if BRAND_LIST_RE.search(lowered):
+        return "brand_list", {}
+    if CATEGORY_LIST_RE.search(lowered):
+        return "category_list", {}
+    return None
+
+
+def _answer(conn, intent: str, params: dict):
+    if intent == "order_status":
+        row = conn.execute(SQL_ORDER_STATUS, params).fetchone()
+        if not row:
+            return None
+        return f"📦 Đơn hàng #{row.id} hiện đang ở trạng thái: {row.status}."
+
+    if intent == "product_price":
+        row = conn.execute(SQL_PRODUCT_PRICE, params).fetchone()
+        if not row:
+            return None
+        msg = f"💰 {row.name} có giá {int(row.price):,}đ."
+        discount = int(row.discount_percentage or 0)
+        if discount > 0:
+            sale = int(row.price) * (100 - discount) // 100
+            msg += f" Đang giảm {discount}%, còn {sale:,}đ."
+        return msg
+
+    if intent == "product_stock":
+        row = conn.execute(SQL_PRODUCT_STOCK, params).fetchone()
+        if not row:
+            return None
+        if int(row.inventory_qty or 0) > 0:
+            return f"✅ {row.name} hiện vẫn còn hàng."
+        return f"❌ {row.name} hiện đã hết hàng."
+
+    if intent == "brand_list":
+        names = [r.name for r in conn.execute(SQL_BRANDS)]
+        if not names:
+            return None
+        return "🏷️ Shop hiện có các thương hiệu: " + ", ".join(names) + "."
+
+    if intent == "category_list":
+        names = [r.name for r in conn.execute(SQL_CATEGORIES)]
+        if not names:
+            return None
+        return "📂 Shop hiện có các danh mục: " + ", ".join(names) + "."
+
+    return None
+
+
+def route(engine, query: str, email: str | None = None, top_product: str | None = None):
+    """
+    Try to answer without the agent. Returns {"answer", "intent"} or None.
+    Blocking (runs SQL) → call through run_blocking from async code.
+    A failing fast-path query is logged and falls through to the agent.
+    """
+    match = classify(query, email, top_product)
+    if match is None:
+        return None
+    intent, params = match
+    try:
+        with engine.connect() as conn:
+            answer = _answer(conn, intent, params)
+    except Exception as e:
+        log.warning("intent_router_error", exc_info=e, extra={"fields": {"intent": intent}})
+        return None
+    if answer is None:
+        return None
+    return {"answer": answer, "intent": intent}
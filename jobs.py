@@ -0,0 +1,118 @@
+# jobs.py
+import asyncio
+import json
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobManager:
+    """
+    Minimal in-process job runner for long agent runs. Jobs are only known to
+    the process that accepted them (see the multi-worker note in main_api.py).
+
+    - at most `max_workers` jobs run at once (the rest wait, queued)
+    - at most `max_pending` queued + running jobs, else QueueFullError
+    - submitting params identical to a queued/running job returns that job
+    - finished jobs are kept for `ttl_seconds`, then dropped
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 20, ttl_seconds: float = 3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._semaphore = None  # created lazily inside the running loop
+        self._jobs: dict[str, dict] = {}
+        self._active_by_key: dict[str, str] = {}
+        self._tasks: set = set()
+
+    @staticmethod
+    def key_for(params: dict) -> str:
+        return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+    def _purge(self):
+        now = time.time()
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job["finished_at"] and now - job["finished_at"] > self.ttl_seconds
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def _pending(self) -> int:
+        return len(self._active_by_key)
+
+    def submit(self, params: dict, fn) -> dict:
+        """Enqueue `await fn(**params)`; must be called from the event loop."""
+        self._purge()
+        key = self.key_for(params)
+        existing = self._active_by_key.get(key)
+        if existing:
+            return self.public(self._jobs[existing], deduplicated=True)
+        if self._pending() >= self.max_pending:
+            raise QueueFullError(f"{self._pending()} jobs already pending")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "params": params,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._jobs[job_id] = job
+        self._active_by_key[key] = job_id
+
+        task = asyncio.create_task(self._run(job, key, fn))
+        self._tasks.add(task)  # keep a reference so the task isn't GC'd
+        task.add_done_callback(self._tasks.discard)
+        return self.public(job)
+
+    async def _run(self, job: dict, key: str, fn):
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                job["result"] = await fn(**job["params"])
+                job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+            print("❌ JOB FAILED:", job["job_id"], job["error"], flush=True)
+        finally:
+            job["finished_at"] = time.time()
+            self._active_by_key.pop(key, None)
+
+    def get(self, job_id: str):
+        self._purge()
+        job = self._jobs.get(job_id)
+        return self.public(job) if job else None
+
+    @staticmethod
+    def public(job: dict, deduplicated: bool = False) -> dict:
+        out = {k: job[k] for k in
+               ("job_id", "status", "params", "result", "error",
+                "created_at", "started_at", "finished_at")}
+        if deduplicated:
+            out["deduplicated"] = True
+        return out
+
+    def stats(self) -> dict:
+        self._purge()
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "ttl_seconds": self.ttl_seconds,
+            "jobs": counts,
+        }
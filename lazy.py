@@ -0,0 +1,62 @@
+# lazy.py
+import threading
+import time
+
+
+class Lazy:
+    """
+    Build-once holder for heavy objects (schema reflection, Chroma client,
+    LLM agent). Nothing happens at import: `get()` builds on first use under
+    a lock, so concurrent first requests share one build. A failed build is
+    not cached — the next `get()` tries again.
+    """
+
+    def __init__(self, factory, name: str | None = None):
+        self.factory = factory
+        self.name = name or factory.__name__
+        self._lock = threading.Lock()
+        self._value = None
+        self._built = False
+        self.build_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def get(self):
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                t0 = time.perf_counter()
+                self._value = self.factory()
+                self.build_seconds = round(time.perf_counter() - t0, 3)
+                self._built = True
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._built = False
+
+    def stats(self) -> dict:
+        return {"ready": self._built, "build_seconds": self.build_seconds}
+
+
+def warm_up(*lazies: Lazy, name: str = "warm-up") -> threading.Thread:
+    """
+    Build lazies in a background thread (called from a lifespan hook):
+    the worker accepts requests immediately, and the first real request
+    usually finds everything ready. Failures are logged and retried on use.
+    """
+    def run():
+        for lazy in lazies:
+            try:
+                lazy.get()
+                print(f"🔥 {lazy.name} ready in {lazy.build_seconds}s", flush=True)
+            except Exception as e:
+                print(f"⚠️ {lazy.name} warm-up failed (retried on first use): {e}", flush=True)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,101 @@
+# logs.py
+"""
+Structured, sampled, non-blocking logging for request hot paths.
+
+Records go through a QueueHandler, so the request thread only enqueues. A
+single QueueListener thread formats them as JSON lines to stdout.
+Hot-path events (log_event(..., sample=True)) are kept with probability
+LOG_SAMPLE_RATE. Warnings and errors are always kept.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        out.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    The stock prepare() formats the message with its own formatter, appends
+    the traceback to it and clears exc_info, so JsonFormatter never saw an
+    exception. Only resolve the %-args here; the listener does the rest.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+
+class SampleFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < LOG_SAMPLE_RATE
+
+
+def _setup():
+    global _listener
+    root = logging.getLogger("billshop")
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(q)
+    handler.addFilter(SampleFilter())  # drop before enqueueing
+    root.addHandler(handler)
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(q, stream)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    if _listener is None:
+        _setup()
+    return logging.getLogger(f"billshop.{name}")
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO,
+              sample: bool = True, **fields):
+    """log_event(log, "top_match", product_id=3, score=0.81) → one JSON line (sampled)."""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, event, extra={"fields": fields, "sampled": sample})
+
+
+class Timer:
+    """ms elapsed, for attaching durations to log events."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+
+    @property
+    def ms(self) -> float:
+        return round((time.perf_counter() - self.t0) * 1000, 1)
@@ -1,20 +1,81 @@
 # main_api.py
+import os
+from typing import Literal
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from match_product import app as match_product_app
-from sql_agent import app as sql_agent_app
+import match_product
+import sql_agent
+from db import pool_stats
+from shared_cache import describe, shared_cache
+from metrics import CONTENT_TYPE, REGISTRY, TimingMiddleware
 
-main = FastAPI(title="BillShop Tool Gateway")
+# Sub-app lifespans don't run when mounted → warm both up from here
+WARM_UP = os.getenv("WARM_UP", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    if WARM_UP:
+        match_product.start_warm_up()
+        sql_agent.start_warm_up()
+    yield
+
+
+main = FastAPI(title="BillShop Tool Gateway", lifespan=lifespan)
 
 # py -m uvicorn main_api:main --host 0.0.0.0 --port 5068 --reload
 
+# 🧵 Multi-worker: every worker has its own agent, DB pool (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW each) and /metrics; embeddings, answers and the schema
+# snapshot are shared through SHARED_CACHE_URL (see shared_cache.py).
+# SHARED_CACHE_URL=sqlite:// py -m uvicorn main_api:main --host 0.0.0.0 --port 5068 --workers 4
+# ⚠️ Background jobs (sale_analysis.py, jobs.py) live in the worker that
+# accepted them: a GET /sale-analysis/jobs/{id} that lands on another worker
+# returns 404. Run that app with a single worker, or behind sticky sessions.
+
 main.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# ⏱️ per-route latency histograms (added last → outermost, times everything)
+main.add_middleware(TimingMiddleware)
 
 # 🔗 Mount sub-apps
-main.mount("/match", match_product_app)
-main.mount("/sql", sql_agent_app)
+main.mount("/match", match_product.app)
+main.mount("/sql", sql_agent.app)
+
+# 🔔 A product sync changes prices / stock → cached public answers are stale
+# (with SHARED_CACHE_URL this reaches every worker's answer cache)
+match_product.catalog_change_hooks.append(
+    lambda: sql_agent.answer_cache.invalidate(sql_agent.PUBLIC_SCOPE))
+
+
+@main.get("/db/pool")
+def db_pool_stats():
+    return pool_stats()
+
+
+@main.get("/shared_cache")
+def shared_cache_stats():
+    return {"pid": os.getpid(), **describe(shared_cache)}
+
+
+@main.get("/ready")
+def ready(only: Literal["match", "sql"] | None = None):
+    """Readiness probe: 200 once schema, agent and catalog are built, else 503."""
+    parts = {"match": match_product.startup_stats(), "sql": sql_agent.startup_stats()}
+    if only:
+        parts = {only: parts[only]}
+    is_ready = all(stats["ready"] for part in parts.values() for stats in part.values())
+    return JSONResponse(status_code=200 if is_ready else 503,
+                        content={"ready": is_ready, **parts})
+
+
+@main.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,142 +1,454 @@
 # match_product.py
 import os
 from fastapi import FastAPI, Query
+from pydantic import BaseModel, Field
+from typing import Literal
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import slugify
-import chromadb
-import re
-from openai import OpenAI  # pip install openai
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache
+from vector_index import LocalVectorIndex
+from name_index import ProductNameIndex
+from embedders import get_embedder
+from jobs import JobManager, QueueFullError
+from concurrency import run_blocking
+from product_indexer import chroma_client, sync_products
+from product_cards import ProductCardCache
+from metrics import span
+from logs import get_logger, log_event
+from lazy import Lazy, warm_up
+from shared_cache import shared_cache
 load_dotenv()
 
-app = FastAPI(title="BillShop Match Product API")
-app.add_middleware(
-    CORSMiddleware, allow_origins=["*"], allow_credentials=True,
-    allow_methods=["*"], allow_headers=["*"],
-)
+log = get_logger("match")
 
 CHROMA_URL = os.getenv("CHROMA_URL")
 FRONTEND_URL = os.getenv("FRONTEND_URL_NEXT")
 IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Must be the collection built with the active embedder (see product_indexer.py)
+PRODUCT_COLLECTION = os.getenv("PRODUCT_COLLECTION", "product_descriptions")
+# "chroma" (remote query per request) or "local" (in-memory NumPy index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# "none" or "int8": in-process storage of catalog / cached query vectors
+EMBED_QUANTIZATION = os.getenv("EMBED_QUANTIZATION", "none").lower()
+
+# Build catalog / embedder in the background as soon as the worker starts
+WARM_UP = os.getenv("WARM_UP", "1") == "1"
+
+# 🐢 Chroma client, catalog indexes and embedder are built on first use or by
+# the lifespan warm-up, never at import (fast, network-free worker startup).
+
+
+def _open_collection():
+    # ✅ Chroma 0.5+ client. The collection keeps its own space (the shipped one
+    # is Chroma's default, squared L2); LocalVectorIndex answers in that space too.
+    return chroma_client().get_or_create_collection(PRODUCT_COLLECTION)
+
+
+chroma_collection = Lazy(_open_collection, "chroma_collection")
+
+# 📦 Optional local index: load catalog embeddings once, search in-process
+local_index = None
+if VECTOR_BACKEND == "local":
+    local_index = LocalVectorIndex(
+        None,  # collection attached when the catalog loads
+        refresh_seconds=float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "0")),
+        quantization=EMBED_QUANTIZATION,
+        retry_seconds=float(os.getenv("VECTOR_INDEX_RETRY_SECONDS", "30")),
+    )
+
+# 🔤 Lexical name index: exact model names resolve without an embedding call
+# Similarity assigned to lexical hits that vector search did not return:
+# exact names get the full base score (+0.5 bonus → always a match); a
+# partial-only hit (+0.2) stays under MIN_MATCH_SCORE unless vector search
+# also returned it, so it can never outrank a real vector match on its own
+LEXICAL_BASE_SCORE = float(os.getenv("LEXICAL_BASE_SCORE", "0.5"))
+LEXICAL_PARTIAL_SCORE = float(os.getenv("LEXICAL_PARTIAL_SCORE", "0.3"))
+MIN_MATCH_SCORE = 0.6
+name_index = ProductNameIndex()
+
+
+def load_catalog_metadatas(page_size: int = 1000) -> list:
+    if local_index is not None and local_index.size:
+        return local_index.metadatas
+    collection = chroma_collection.get()
+    metas, offset = [], 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        batch = page.get("metadatas") or []
+        metas.extend(batch)
+        offset += len(batch)
+        if len(batch) < page_size:
+            return metas
 
-# ✅ Chroma 0.5+ client
-host, port = re.sub(r"^https?://", "", CHROMA_URL).split(":")
-client = chromadb.HttpClient(host=host, port=int(port))
-collection = client.get_or_create_collection("product_descriptions")
 
-# ✅ OpenAI embeddings (must match how the collection was built)
-oa = OpenAI(api_key=OPENAI_API_KEY)
+def _load_catalog():
+    # no try/except: a failed load leaves the Lazy unbuilt, so /ready stays 503
+    # and the next catalog.get() retries instead of serving without indexes
+    collection = chroma_collection.get()
+    if local_index is not None:
+        local_index.collection = collection
+        local_index.refresh()
+    name_index.build(load_catalog_metadatas())
+    return True
+
+
+catalog = Lazy(_load_catalog, "product_catalog")
+
+# ✅ Embedder (must match how the collection was built):
+# EMBEDDER=openai (text-embedding-3-large) or EMBEDDER=local (CPU ONNX model)
+query_embedder = Lazy(get_embedder, "embedder")
+
+
+def start_warm_up():
+    """Background build of Chroma client, catalog indexes and embedder."""
+    return warm_up(catalog, query_embedder, name="match-warm-up")
+
+
+def startup_stats() -> dict:
+    return {lazy.name: lazy.stats() for lazy in (chroma_collection, catalog, query_embedder)}
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    # only runs when served directly; main_api starts it for the mounted app
+    if WARM_UP:
+        start_warm_up()
+    yield
+
+
+app = FastAPI(title="BillShop Match Product API", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+    allow_methods=["*"], allow_headers=["*"],
+)
+
+# ♻️ Same product names repeat all day → cache query vectors in-process
+embedding_cache = EmbeddingCache(
+    max_size=int(os.getenv("EMBED_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("EMBED_CACHE_TTL", "3600")),
+    quantization=EMBED_QUANTIZATION,
+    shared=shared_cache,  # SHARED_CACHE_URL: one cache for all workers
+)
 
 
 def embed_query(text: str):
-    emb = oa.embeddings.create(model="text-embedding-3-large", input=text)
-    return emb.data[0].embedding  # list[float], 3072 dims
+    embedder = query_embedder.get()
+    cached = embedding_cache.get(embedder.name, text)
+    if cached is not None:
+        return cached
+    # float32 ndarray (3072 dims for text-embedding-3-large)
+    with span("embedding"):
+        vec = embedder.embed([text])[0]
+    return embedding_cache.put(embedder.name, text, vec)
+
+
+def embed_queries(texts: list[str]):
+    """Embed many queries with ONE embedder call (cache hits are skipped)."""
+    embedder = query_embedder.get()
+    vecs = [embedding_cache.get(embedder.name, t) for t in texts]
+    missing = [i for i, v in enumerate(vecs) if v is None]
+    if missing:
+        with span("embedding"):
+            new = embedder.embed([texts[i] for i in missing])
+        for i, vec in zip(missing, new):
+            vecs[i] = embedding_cache.put(embedder.name, texts[i], vec)
+    return vecs
+
+
+@app.get("/embedding_cache")
+def embedding_cache_stats():
+    return embedding_cache.stats()
+
+
+def search_products(qvecs, n_results: int = 8):
+    """Top-k search for one or more query vectors (local index first, Chroma as fallback)."""
+    catalog.get()
+    if local_index is not None:
+        try:
+            if local_index.refresh_if_stale():
+                name_index.build(local_index.metadatas)
+            if local_index.size:
+                with span("vector_search_local"):
+                    return local_index.query(qvecs, n_results=n_results)
+        except Exception as e:
+            log.warning("local_index_error", exc_info=e)
+
+    # 🔍 Query using query_embeddings (NOT query_texts)
+    collection = chroma_collection.get()
+    with span("vector_search_chroma"):
+        results = collection.query(
+            query_embeddings=[v.tolist() for v in qvecs],
+            n_results=n_results,
+            include=["metadatas", "distances", "documents"]
+        )
+    return results
+
+
+@app.post("/vector_index/refresh")
+def refresh_vector_index():
+    if local_index is None:
+        return {"success": False, "message": "VECTOR_BACKEND is not 'local'"}
+    catalog.get()
+    count = local_index.refresh()
+    name_index.build(local_index.metadatas)
+    return {"success": True, "size": count}
+
+
+@app.post("/name_index/refresh")
+def refresh_name_index():
+    count = name_index.build(load_catalog_metadatas())
+    return {"success": True, "size": count}
+
+
+@app.get("/name_index")
+def name_index_stats():
+    return name_index.stats()
+
+
+@app.get("/startup")
+def startup_status():
+    return startup_stats()
+
+
+@app.get("/vector_index")
+def vector_index_stats():
+    if local_index is None:
+        return {"backend": "chroma"}
+    return {"backend": "local", **local_index.stats()}
+
+
+# ==================================================
+# 🔄 MYSQL → CHROMA SYNC (background job)
+# ==================================================
+index_jobs = JobManager(max_workers=1, max_pending=1)
+
+# 🔔 Called (blocking) after a sync upserted or deleted products, e.g. to drop
+# cached public answers about prices / stock (main_api wires the SQL app's)
+catalog_change_hooks: list = []
+
+
+async def run_product_sync(prune: bool = False, full: bool = False):
+    await run_blocking(catalog.get)
+    embedder = await run_blocking(query_embedder.get)
+    stats = await run_blocking(
+        sync_products, chroma_collection.get(), embedder=embedder, prune=prune, full=full,
+        batch_size=int(os.getenv("INDEX_BATCH_SIZE", "256")),
+        concurrency=int(os.getenv("INDEX_CONCURRENCY", "4")),
+    )
+    # new / changed products must be searchable right away
+    if local_index is not None:
+        await run_blocking(local_index.refresh)
+    await run_blocking(lambda: name_index.build(load_catalog_metadatas()))
+    if stats.get("upserted") or stats.get("deleted"):
+        for hook in catalog_change_hooks:
+            await run_blocking(hook)
+    return stats
+
+
+@app.post("/product_index/sync", status_code=202)
+async def submit_product_sync(prune: bool = False, full: bool = False):
+    try:
+        return index_jobs.submit({"prune": prune, "full": full}, run_product_sync)
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "message": "A sync is already running", "details": str(e)},
+        )
+
+
+@app.get("/product_index/sync/{job_id}")
+async def get_product_sync(job_id: str):
+    job = index_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Job not found or expired"},
+        )
+    return job
+
+
+def _name_match_kind(meta: dict, normalized_q: str, lexical: dict):
+    if name_index.size:
+        hit = lexical.get(meta.get("product_id"))
+        return hit["kind"] if hit else None
+    # no index loaded → old per-candidate substring check
+    normalized_name = " ".join(meta.get("name", "").lower().split())
+    if normalized_name in normalized_q:
+        return "exact"
+    if normalized_name.replace(" pro", "") in normalized_q:
+        return "partial"
+    return None
+
+
+def _candidate(meta: dict, score: float, kind, source: str) -> dict:
+    bonus = 0.5 if kind == "exact" else (0.2 if kind == "partial" else 0.0)
+    total = score + bonus
+    return {
+        "name": meta.get("name", ""),
+        "price": float(meta.get("price", 0) or 0),
+        "product_id": meta.get("product_id"),
+        "featured_image": meta.get("featured_image"),
+        "score": round(score, 4),
+        "total_score": round(total, 4),
+        "source": source,
+    }
+
+
+# 🃏 slug / URL / card HTML depend only on the product → render once per product version
+card_cache = ProductCardCache(
+    FRONTEND_URL, IMAGE_BASE_URL,
+    max_size=int(os.getenv("CARD_CACHE_SIZE", "4096")),
+)
+
+
+@app.get("/card_cache")
+def card_cache_stats():
+    return card_cache.stats()
+
+
+def build_match(query: str, metas: list, dists: list, lexical: dict | None = None,
+                card_format: str = "html") -> dict:
+    """
+    Score vector candidates (+ lexical name hits) for one query and render the top card.
+    card_format="json" returns the compact `card` dict instead of `card_html`.
+    """
+    lexical = lexical or {}
+    if not metas and not lexical:
+        return {"success": False, "message": "No products found"}
+
+    normalized_q = " ".join(query.lower().split())
+
+    candidates = []
+    for meta, dist in zip(metas, dists):
+        score = 1 - float(dist)  # convert distance → similarity
+        kind = _name_match_kind(meta, normalized_q, lexical)
+        candidates.append(_candidate(meta, score, kind, "vector"))
+
+    # ➕ exact/partial names the vector search missed
+    seen = {c["product_id"] for c in candidates}
+    for pid, hit in lexical.items():
+        if pid not in seen:
+            base = LEXICAL_BASE_SCORE if hit["kind"] == "exact" else LEXICAL_PARTIAL_SCORE
+            candidates.append(_candidate(hit["meta"], base, hit["kind"], "lexical"))
+
+    if not candidates:
+        return {"success": False, "message": "No match found"}
+
+    # 🟢 Apply minimum score filter
+    filtered = [c for c in candidates if c["total_score"] >= MIN_MATCH_SCORE]
+
+    if not filtered:
+        return {"success": False, "top_match": "No product matched the minimum score "}
+
+    filtered.sort(key=lambda x: x["total_score"], reverse=True)
+    top = filtered[0]
+
+    log_event(log, "top_match", product_id=top["product_id"], name=top["name"],
+              score=top["total_score"], source=top["source"])
+
+    rendered = card_cache.render(top)
+
+    return {
+        "success": True,
+        "top_match": top,
+        "matched_products": [
+            f"{p['name']} (điểm {p['total_score']:.2f})" for p in candidates[:5]
+        ],
+        **({"card": rendered["card"]} if card_format == "json"
+           else {"card_html": rendered["html"]}),
+    }
+
+
+def _error_response(e: Exception):
+    log.error("vector_search_error", exc_info=e)
+    return JSONResponse(
+        status_code=500,
+        content={"success": False,
+                 "message": f"Internal error: {type(e).__name__}", "details": str(e)},
+    )
 
 
 @app.get("/match_product")
-def match_product(query: str = Query(..., description="User message to match product")):
+def match_product(
+    query: str = Query(..., description="User message to match product"),
+    card_format: Literal["html", "json"] = Query("html", description="html | json (compact card)"),
+):
     try:
         query = query.strip()
         if not query:
             return {"success": False, "message": "Empty query"}
+        catalog.get()
+
+        # 🔤 Unambiguous exact product name → no embedding / vector search
+        lexical = name_index.lookup(query) if name_index.size else {}
+        sole = name_index.unambiguous(lexical)
+        if sole is not None:
+            pid = sole["meta"].get("product_id")
+            return build_match(query, [], [], {pid: sole}, card_format)
 
         # 🔑 IMPORTANT: we embed query ourselves to avoid ONNX + ensure dimension match
         qvec = embed_query(query)
 
-        # 🔍 Query using query_embeddings (NOT query_texts)
-        results = collection.query(
-            query_embeddings=[qvec],
-            n_results=8,
-            include=["metadatas", "distances", "documents"]
-        )
+        results = search_products([qvec], n_results=8)
 
-        if not results.get("metadatas") or not results["metadatas"][0]:
-            return {"success": False, "message": "No products found"}
-
-        metas = results["metadatas"][0]
-        dists = results["distances"][0]
-        normalized_q = " ".join(query.lower().split())
-
-        candidates = []
-        for meta, dist in zip(metas, dists):
-            name = meta.get("name", "")
-            price = float(meta.get("price", 0) or 0)
-            score = 1 - float(dist)  # convert distance → similarity
-            normalized_name = " ".join(name.lower().split())
-            has_exact = normalized_name in normalized_q
-            has_partial = normalized_name.replace(" pro", "") in normalized_q
-            bonus = 0.5 if has_exact else (0.2 if has_partial else 0.0)
-            total = score + bonus
-            candidates.append({
-                "name": name,
-                "price": price,
-                "product_id": meta.get("product_id"),
-                "featured_image": meta.get("featured_image"),
-                "score": round(score, 4),
-                "total_score": round(total, 4),
-            })
-
-        if not candidates:
-            return {"success": False, "message": "No match found"}
-
-        # 🟢 Apply minimum score filter
-        filtered = [c for c in candidates if c["total_score"] >= 0.6]
-
-        if not filtered:
-            return {"success": False, "top_match": "No product matched the minimum score "}
-
-        filtered.sort(key=lambda x: x["total_score"], reverse=True)
-        top = filtered[0]
-
-        print("✅ Top match:", top["name"],
-              f"(score: {top['total_score']})", flush=True)
-
-        slug = slugify.slugify(top["name"])
-        url = f"{FRONTEND_URL}/san-pham/{slug}-{top['product_id']}"
-        encoded_msg = f"tôi muốn thêm {top['name']} vào giỏ hàng"
-        img_src = f"{IMAGE_BASE_URL}/{top['featured_image']}"
-
-        card_html = f"""
-<div class="product-card"
-     style="border:1px solid #ccc;border-radius:8px;
-            padding:8px;margin-bottom:8px;
-            display:flex;align-items:center;gap:10px;
-            background:#f8f9fa;max-width:400px;">
-  <img src="{img_src}" alt="{top['name']}"
-       style="width:70px;height:70px;object-fit:contain;border-radius:6px;" />
-  <div style="flex:1;line-height:1.3;">
-    <a href="{url}"
-       style="font-weight:bold;font-size:14px;color:#1D4ED8;display:block;margin-bottom:4px;"
-       target="_blank">{top['name']}</a>
-    <span style="font-size:13px;color:#16A34A;">💰 {int(top['price']):,}đ</span>
-  </div>
-  <button class="add-to-cart-btn"
-          data-product="{top['name']}" data-msg="{encoded_msg}"
-          style="background:#FACC15;color:#000;border:none;
-                 padding:4px 8px;border-radius:4px;
-                 font-size:12px;font-weight:500;cursor:pointer;">
-    🛒 Thêm
-  </button>
-</div>
-""".strip()
-
-        return {
-            "success": True,
-            "top_match": top,
-            "matched_products": [
-                f"{p['name']} (điểm {p['total_score']:.2f})" for p in candidates[:5]
-            ],
-            "card_html": card_html,
-        }
+        metas = (results.get("metadatas") or [[]])[0]
+        dists = (results.get("distances") or [[]])[0]
+        return build_match(query, metas, dists, lexical, card_format)
 
     except Exception as e:
-        import traceback
-        print("❌ VECTOR SEARCH ERROR:", e, flush=True)
-        print(traceback.format_exc(), flush=True)
-        return JSONResponse(
-            status_code=500,
-            content={"success": False,
-                     "message": f"Internal error: {type(e).__name__}", "details": str(e)},
-        )
+        return _error_response(e)
+
+
+# one batch = one embedder call + one search → cap the fan-out (422 above it)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "32"))
+
+
+class BatchMatchRequest(BaseModel):
+    queries: list[str] = Field(..., max_length=BATCH_MAX_QUERIES)
+    card_format: Literal["html", "json"] = "html"
+
+
+@app.post("/match_product/batch")
+def match_product_batch(req: BatchMatchRequest):
+    """
+    Match many product mentions at once:
+    1 embeddings.create + 1 multi-vector search instead of N×2 round trips.
+    Results are returned in the same order as `queries`.
+    """
+    try:
+        queries = [q.strip() for q in req.queries]
+        todo = [i for i, q in enumerate(queries) if q]
+        out = [{"query": q, "success": False, "message": "Empty query"} for q in queries]
+        if not todo:
+            return {"success": True, "results": out}
+        catalog.get()
+
+        lexical = {i: name_index.lookup(queries[i]) if name_index.size else {}
+                   for i in todo}
+        vector_todo = []
+        for i in todo:
+            sole = name_index.unambiguous(lexical[i])
+            if sole is not None:
+                pid = sole["meta"].get("product_id")
+                out[i] = {"query": queries[i],
+                          **build_match(queries[i], [], [], {pid: sole}, req.card_format)}
+            else:
+                vector_todo.append(i)
+
+        if vector_todo:
+            qvecs = embed_queries([queries[i] for i in vector_todo])
+            results = search_products(qvecs, n_results=8)
+            all_metas = results.get("metadatas") or [[] for _ in vector_todo]
+            all_dists = results.get("distances") or [[] for _ in vector_todo]
+
+            for pos, i in enumerate(vector_todo):
+                out[i] = {"query": queries[i],
+                          **build_match(queries[i], all_metas[pos], all_dists[pos],
+                                        lexical[i], req.card_format)}
+
+        return {"success": True, "results": out}
+
+    except Exception as e:
+        return _error_response(e)
@@ -0,0 +1,186 @@
+# metrics.py
+"""
+Small in-process Prometheus registry (text exposition format 0.0.4):
+histograms + counters, a `span()` timer, an ASGI timing middleware and
+SQLAlchemy hooks. Scraped from the gateway's GET /metrics.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}  # labels → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = _labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            inf = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def histogram(self, name, help_, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_, labelnames, buckets)
+
+    def counter(self, name, help_, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help_, labelnames)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_SECONDS = REGISTRY.histogram(
+    "billshop_http_request_seconds", "HTTP request latency", ("method", "route", "status"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "billshop_stage_seconds", "Latency of internal stages (embedding, vector search, ...)",
+    ("stage",))
+SQL_SECONDS = REGISTRY.histogram(
+    "billshop_sql_seconds", "SQL statement execution time", ("statement",))
+TOOL_SECONDS = REGISTRY.histogram(
+    "billshop_agent_tool_seconds", "Agent tool call latency", ("tool", "status"))
+LLM_SECONDS = REGISTRY.histogram(
+    "billshop_llm_seconds", "LLM call latency", ("model",))
+LLM_TOKENS = REGISTRY.counter(
+    "billshop_llm_tokens_total", "LLM tokens used", ("model", "kind"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def span(stage: str):
+    """with span("embedding"): ... → billshop_stage_seconds{stage="embedding"}"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead, streaming-safe).
+    Labels by route template, e.g. /match/match_product, never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = (scope.get("root_path", "") + route.path) if route is not None else "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - t0, method=scope["method"],
+                                 route=template, status=str(status["code"]))
+
+
+def instrument_engine(engine):
+    """Time every statement executed through `engine` (labelled by its first keyword)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("metrics_t0")
+        if not stack:
+            return
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        SQL_SECONDS.observe(time.perf_counter() - stack.pop(), statement=keyword)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("metrics_t0") if context.connection else None
+        if stack:
+            stack.pop()
@@ -0,0 +1,98 @@
+# name_index.py
+import re
+import threading
+import time
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> tuple[str, ...]:
+    return tuple(TOKEN_RE.findall(text.lower()))
+
+
+class ProductNameIndex:
+    """
+    Token n-gram index over normalized product names.
+
+    Each name is keyed by its first token (1-token names) or first two
+    tokens, so a query only checks names that can start at one of its own
+    positions, instead of testing `name in query` for every candidate.
+    A name matches when all its tokens appear contiguously in the query:
+      - "exact"   : the full name
+      - "partial" : the name without "pro" (same idea as the old
+                    `name.replace(" pro", "")` bonus)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._unigrams: dict[str, list] = {}
+        self._bigrams: dict[tuple[str, str], list] = {}
+        self.size = 0
+        self.loaded_at = None
+
+    def build(self, metadatas: list[dict]):
+        unigrams, bigrams = {}, {}
+        count = 0
+        for meta in metadatas:
+            if not meta or not meta.get("name"):
+                continue
+            tokens = tokenize(meta["name"])
+            if not tokens:
+                continue
+            variants = [(tokens, "exact")]
+            no_pro = tuple(t for t in tokens if t != "pro")
+            if no_pro and no_pro != tokens:
+                variants.append((no_pro, "partial"))
+            for toks, kind in variants:
+                entry = (toks, kind, meta)
+                if len(toks) == 1:
+                    unigrams.setdefault(toks[0], []).append(entry)
+                else:
+                    bigrams.setdefault(toks[:2], []).append(entry)
+            count += 1
+
+        with self._lock:
+            self._unigrams, self._bigrams = unigrams, bigrams
+            self.size = count
+            self.loaded_at = time.time()
+        print(f"🔤 Product name index built: {count} names", flush=True)
+        return count
+
+    def lookup(self, query: str) -> dict:
+        """
+        Names contained (token-aligned) in the query.
+        Returns {product_id: {"kind": "exact"|"partial", "length": n_tokens, "meta": {...}}};
+        an exact hit wins over a partial one for the same product.
+        """
+        q = tokenize(query)
+        with self._lock:
+            unigrams, bigrams = self._unigrams, self._bigrams
+
+        hits: dict = {}
+        for i, tok in enumerate(q):
+            entries = list(unigrams.get(tok, ()))
+            if i + 1 < len(q):
+                entries += bigrams.get((tok, q[i + 1]), ())
+            for toks, kind, meta in entries:
+                n = len(toks)
+                if q[i:i + n] != toks:
+                    continue
+                pid = meta.get("product_id")
+                prev = hits.get(pid)
+                if prev is None or (prev["kind"] == "partial" and kind == "exact") \
+                        or (prev["kind"] == kind and n > prev["length"]):
+                    hits[pid] = {"kind": kind, "length": n, "meta": meta}
+        return hits
+
+    @staticmethod
+    def unambiguous(hits: dict):
+        """The single product whose exact name is the longest match, else None."""
+        exact = [h for h in hits.values() if h["kind"] == "exact"]
+        if not exact:
+            return None
+        longest = max(h["length"] for h in exact)
+        top = [h for h in exact if h["length"] == longest]
+        return top[0] if len(top) == 1 else None
+
+    def stats(self) -> dict:
+        return {"size": self.size, "loaded_at": self.loaded_at}
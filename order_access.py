@@ -0,0 +1,142 @@
+# order_access.py
+import re
+import threading
+import time
+
+from sqlalchemy import bindparam, inspect, text
+
+# Any standalone number (also "mã123", "#55") in a message about an order
+ORDER_WORDS = ("order", "đơn")
+NUMBER_RE = re.compile(r"(?<!\d)\d+(?!\d)")
+
+# One round trip for any number of order IDs mentioned in a message
+SQL_OWNED_ORDERS = text("""
+    SELECT o.id
+    FROM `order` o
+    JOIN customer c ON o.customer_id = c.id
+    WHERE c.email = :email AND o.id IN :order_ids
+""").bindparams(bindparam("order_ids", expanding=True))
+
+# (table, column, index name) the ownership lookup relies on
+REQUIRED_INDEXES = [
+    ("customer", "email", "idx_customer_email"),
+    ("order", "customer_id", "idx_order_customer_id"),
+]
+
+
+def mentions_order(message: str) -> bool:
+    lowered = message.lower()
+    return any(w in lowered for w in ORDER_WORDS)
+
+
+def extract_order_ids(message: str) -> list[str]:
+    """
+    Every number in a message that mentions an order, de-duplicated, in order.
+    Deliberately loose (fail closed): "đơn hàng mã 123", "order id: 55" and
+    plain quantities are all ownership-checked, so no phrasing lets an order
+    id reach the agent unchecked.
+    """
+    if not mentions_order(message):
+        return []
+    return list(dict.fromkeys(NUMBER_RE.findall(message)))
+
+
+class OrderAccess:
+    """
+    Verifies that orders belong to an email, with a short-TTL cache of
+    verified (order_id, email) pairs so repeat questions about the same
+    order skip the DB entirely. Only ownership is cached: a "not owned"
+    answer is re-checked every time, so a just-placed order is never refused.
+    """
+
+    def __init__(self, engine, ttl_seconds: float = 120, max_size: int = 10000):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._cache: dict[tuple[str, str], float] = {}  # → verified at
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, order_id: str, email: str, now: float) -> bool:
+        verified_at = self._cache.get((order_id, email))
+        return verified_at is not None and now - verified_at <= self.ttl_seconds
+
+    def owned_orders(self, email: str, order_ids: list[str]) -> set[str]:
+        """Return the subset of `order_ids` owned by `email` (blocking)."""
+        email = email.strip().lower()
+        now = time.monotonic()
+        owned, unknown = set(), []
+        with self._lock:
+            for oid in order_ids:
+                if self._cached(oid, email, now):
+                    owned.add(oid)
+                else:
+                    unknown.append(oid)
+            self.hits += len(order_ids) - len(unknown)
+            self.misses += len(unknown)
+
+        if unknown:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    SQL_OWNED_ORDERS,
+                    {"email": email, "order_ids": [int(i) for i in unknown]},
+                ).fetchall()
+            found = {str(r.id) for r in rows}
+            owned |= found
+            with self._lock:
+                if len(self._cache) + len(found) > self.max_size:
+                    self._cache.clear()
+                for oid in found:
+                    self._cache[(oid, email)] = now
+        return owned
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def missing_indexes(engine) -> list[tuple[str, str, str]]:
+    """REQUIRED_INDEXES entries with no index whose first column matches."""
+    insp = inspect(engine)
+    missing = []
+    for table, column, name in REQUIRED_INDEXES:
+        leading = {tuple(ix["column_names"])[:1] for ix in insp.get_indexes(table)}
+        for fk in insp.get_foreign_keys(table):
+            # InnoDB indexes FK columns automatically
+            leading.add(tuple(fk["constrained_columns"])[:1])
+        unique = insp.get_unique_constraints(table)
+        leading |= {tuple(u["column_names"])[:1] for u in unique}
+        if (column,) not in leading:
+            missing.append((table, column, name))
+    return missing
+
+
+def create_missing_indexes(engine) -> list[str]:
+    created = []
+    with engine.begin() as conn:
+        for table, column, name in missing_indexes(engine):
+            conn.execute(text(f"CREATE INDEX `{name}` ON `{table}` (`{column}`)"))
+            created.append(name)
+    return created
+
+
+if __name__ == "__main__":
+    # py order_access.py            → report missing indexes
+    # py order_access.py --create   → create them
+    import sys
+    from db import engine
+
+    if "--create" in sys.argv:
+        print("✅ Created:", create_missing_indexes(engine) or "nothing to do")
+    else:
+        missing = missing_indexes(engine)
+        if missing:
+            for table, column, name in missing:
+                print(f"❌ Missing index on {table}.{column} (suggested: {name})")
+            sys.exit(1)
+        print("✅ All order-access indexes present")
@@ -0,0 +1,101 @@
+# product_cards.py
+import html
+import threading
+from collections import OrderedDict
+
+import slugify
+
+# Precompiled once; every {field} is filled with an HTML-escaped value
+CARD_TEMPLATE = """
+<div class="product-card"
+     style="border:1px solid #ccc;border-radius:8px;
+            padding:8px;margin-bottom:8px;
+            display:flex;align-items:center;gap:10px;
+            background:#f8f9fa;max-width:400px;">
+  <img src="{img_src}" alt="{name}"
+       style="width:70px;height:70px;object-fit:contain;border-radius:6px;" />
+  <div style="flex:1;line-height:1.3;">
+    <a href="{url}"
+       style="font-weight:bold;font-size:14px;color:#1D4ED8;display:block;margin-bottom:4px;"
+       target="_blank">{name}</a>
+    <span style="font-size:13px;color:#16A34A;">💰 {price}đ</span>
+  </div>
+  <button class="add-to-cart-btn"
+          data-product="{name}" data-msg="{msg}"
+          style="background:#FACC15;color:#000;border:none;
+                 padding:4px 8px;border-radius:4px;
+                 font-size:12px;font-weight:500;cursor:pointer;">
+    🛒 Thêm
+  </button>
+</div>
+""".strip()
+
+
+class ProductCardCache:
+    """
+    Per-product render cache: slug, URL, compact JSON card and card HTML.
+    Key = (product_id, version) where version is every field the card is
+    rendered from, so a renamed / repriced product renders a fresh card.
+    """
+
+    def __init__(self, frontend_url: str, image_base_url: str, max_size: int = 4096):
+        self.frontend_url = frontend_url
+        self.image_base_url = image_base_url
+        self.max_size = max_size
+        self._data: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _render(self, product: dict) -> dict:
+        name = product.get("name", "")
+        pid = product.get("product_id")
+        slug = slugify.slugify(name)
+        url = f"{self.frontend_url}/san-pham/{slug}-{pid}"
+        img_src = f"{self.image_base_url}/{product.get('featured_image')}"
+        msg = f"tôi muốn thêm {name} vào giỏ hàng"
+        price = int(product.get("price", 0) or 0)
+
+        card = {"product_id": pid, "name": name, "price": price,
+                "url": url, "image": img_src, "msg": msg}
+        esc = lambda v: html.escape(str(v), quote=True)  # noqa: E731
+        card_html = CARD_TEMPLATE.format(
+            img_src=esc(img_src), url=esc(url), name=esc(name),
+            msg=esc(msg), price=f"{price:,}",
+        )
+        return {"slug": slug, "url": url, "card": card, "html": card_html}
+
+    def render(self, product: dict) -> dict:
+        key = (product.get("product_id"), product.get("name", ""),
+               product.get("price"), product.get("featured_image"))
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        rendered = self._render(product)
+        with self._lock:
+            self._data[key] = rendered
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return rendered
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
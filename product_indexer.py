@@ -0,0 +1,281 @@
+# product_indexer.py
+"""
+Build / rebuild Chroma product collections.
+
+    # MySQL → product_descriptions (only new / changed products are embedded;
+    # re-running after a crash resumes where it stopped)
+    py product_indexer.py sync
+    py product_indexer.py sync --prune          # also drop deleted products
+
+    # re-embed an existing collection with another embedder (e.g. the local
+    # CPU model, whose dimensionality differs from text-embedding-3-large)
+    EMBEDDER=local LOCAL_EMBED_MODEL_DIR=./models/minilm \
+        py product_indexer.py reembed --source product_descriptions \
+                                      --target product_descriptions_local
+
+Then serve it with PRODUCT_COLLECTION=product_descriptions_local EMBEDDER=local.
+
+    # shortened text-embedding-3-large vectors (serve with EMBED_DIMENSIONS=1024)
+    py product_indexer.py reembed --target product_descriptions_1024 --dimensions 1024
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from embedders import get_embedder
+
+load_dotenv()
+
+
+def chroma_client():
+    import chromadb
+
+    host, port = re.sub(r"^https?://", "", os.getenv("CHROMA_URL")).split(":")
+    return chromadb.HttpClient(host=host, port=int(port))
+
+
+def iter_collection(collection, page_size: int = 500):
+    """Yield (ids, documents, metadatas) pages from a collection."""
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"],
+                              limit=page_size, offset=offset)
+        ids = page.get("ids") or []
+        if not ids:
+            return
+        yield ids, page.get("documents") or [""] * len(ids), page.get("metadatas")
+        offset += len(ids)
+        if len(ids) < page_size:
+            return
+
+
+# ==================================================
+# MYSQL → CHROMA SYNC
+# ==================================================
+PRODUCT_SYNC_SQL = text("""
+    SELECT p.id, p.name, p.price, p.discount_percentage, p.featured_image,
+           p.description, b.name AS brand, c.name AS category
+    FROM product p
+    LEFT JOIN brand b ON b.id = p.brand_id
+    LEFT JOIN category c ON c.id = p.category_id
+    WHERE p.id > :last_id
+    ORDER BY p.id
+    LIMIT :limit
+""")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def product_document(row: dict) -> str:
+    """Text that gets embedded: name, brand, category, description (HTML stripped)."""
+    description = " ".join(_TAG_RE.sub(" ", html.unescape(row.get("description") or "")).split())
+    parts = [row.get("name") or ""]
+    if row.get("brand"):
+        parts.append(f"Thương hiệu: {row['brand']}")
+    if row.get("category"):
+        parts.append(f"Danh mục: {row['category']}")
+    if description:
+        parts.append(description)
+    return "\n".join(parts)
+
+
+def product_metadata(row: dict) -> dict:
+    # Chroma metadata values must be str / int / float / bool (no None)
+    meta = {
+        "product_id": int(row["id"]),
+        "name": row.get("name") or "",
+        "price": float(row.get("price") or 0),
+        "discount_percentage": float(row.get("discount_percentage") or 0),
+        "featured_image": row.get("featured_image") or "",
+    }
+    if row.get("brand"):
+        meta["brand"] = row["brand"]
+    if row.get("category"):
+        meta["category"] = row["category"]
+    return meta
+
+
+def content_hash(embedder_name: str, document: str, meta: dict) -> str:
+    # embedder name is part of the hash: switching model / dims re-embeds everything
+    payload = json.dumps([embedder_name, document, meta], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def with_retry(fn, *args, attempts: int = 5, base_delay: float = 1.0):
+    """Exponential backoff with jitter (rate limits, transient 5xx)."""
+    for attempt in range(attempts):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = base_delay * 2 ** attempt * (0.5 + random.random())
+            print(f"⚠️ {type(e).__name__}: {e} → retry in {delay:.1f}s", flush=True)
+            time.sleep(delay)
+
+
+def existing_hashes(collection, page_size: int = 1000) -> dict:
+    """{chroma id: content_hash} for everything already indexed."""
+    out = {}
+    for ids, _, metas in iter_collection(collection, page_size=page_size):
+        for id_, meta in zip(ids, metas or [{}] * len(ids)):
+            out[id_] = (meta or {}).get("content_hash")
+    return out
+
+
+def iter_product_batches(engine, batch_size: int):
+    """
+    Page product rows by primary key (keyset). Each page uses its own short
+    connection, so nothing stays open while the batch is being embedded.
+    """
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = [dict(r._mapping) for r in conn.execute(
+                PRODUCT_SYNC_SQL, {"last_id": last_id, "limit": batch_size})]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def sync_products(collection=None, engine=None, embedder=None, batch_size: int = 256,
+                  concurrency: int = 4, prune: bool = False, full: bool = False) -> dict:
+    """
+    Upsert MySQL products into Chroma.
+
+    Rows whose content hash matches the stored one are skipped, so an
+    incremental sync only embeds what changed and an interrupted rebuild
+    resumes for free. Up to `concurrency` embedding batches are in flight;
+    each finished batch is upserted (with its hashes) right away.
+    """
+    if collection is None:
+        # Chroma's default space (squared L2), like the collection match_product
+        # was tuned on: its 0.6 threshold on 1 - d means cos >= 0.8
+        collection = chroma_client().get_or_create_collection(
+            os.getenv("PRODUCT_COLLECTION", "product_descriptions"))
+    if engine is None:
+        from db import engine
+    embedder = embedder or get_embedder()
+
+    t0 = time.perf_counter()
+    known = {} if full else existing_hashes(collection)
+    seen = set()
+    stats = {"scanned": 0, "skipped": 0, "upserted": 0, "deleted": 0}
+
+    def embed_and_upsert(ids, docs, metas):
+        vecs = with_retry(embedder.embed, docs)
+        with_retry(lambda: collection.upsert(
+            ids=ids, embeddings=vecs.tolist(), documents=docs, metadatas=metas))
+        return len(ids)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = set()
+        for rows in iter_product_batches(engine, batch_size):
+            ids, docs, metas = [], [], []
+            for row in rows:
+                id_ = str(row["id"])
+                seen.add(id_)
+                doc, meta = product_document(row), product_metadata(row)
+                meta["content_hash"] = content_hash(embedder.name, doc, meta)
+                if known.get(id_) == meta["content_hash"]:
+                    stats["skipped"] += 1
+                    continue
+                ids.append(id_)
+                docs.append(doc)
+                metas.append(meta)
+            stats["scanned"] += len(rows)
+            if not ids:
+                continue
+
+            # back-pressure: never more than `concurrency` batches in flight
+            while len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in done:
+                    stats["upserted"] += f.result()
+            in_flight.add(pool.submit(embed_and_upsert, ids, docs, metas))
+            print(f"⏳ scanned {stats['scanned']}, upserted {stats['upserted']}, "
+                  f"skipped {stats['skipped']}", flush=True)
+
+        for f in in_flight:
+            stats["upserted"] += f.result()
+
+    if prune:
+        stale = [id_ for id_ in (known or existing_hashes(collection)) if id_ not in seen]
+        for i in range(0, len(stale), batch_size):
+            collection.delete(ids=stale[i:i + batch_size])
+        stats["deleted"] = len(stale)
+
+    stats["embedder"] = embedder.name
+    stats["seconds"] = round(time.perf_counter() - t0, 1)
+    print(f"✅ Product sync: {stats}", flush=True)
+    return stats
+
+
+def reembed(source: str, target: str, batch_size: int = 256, recreate: bool = False,
+            dimensions: int | None = None):
+    client = chroma_client()
+    embedder = get_embedder(dimensions=dimensions)
+    src = client.get_collection(source)
+    if recreate:
+        try:
+            client.delete_collection(target)
+        except Exception:
+            pass
+    # same distance space as the source, so match scores keep their meaning
+    dst = client.get_or_create_collection(target, metadata=src.metadata or None)
+
+    total, t0 = 0, time.perf_counter()
+    for ids, docs, metas in iter_collection(src, page_size=batch_size):
+        # embed the stored description (fall back to the product name)
+        texts = [d or (m or {}).get("name", "") for d, m in zip(docs, metas or [{}] * len(ids))]
+        vecs = embedder.embed(texts)
+        dst.upsert(ids=ids, embeddings=vecs.tolist(), documents=docs, metadatas=metas)
+        total += len(ids)
+        print(f"⏳ {total} products re-embedded", flush=True)
+
+    print(f"✅ {target}: {total} products with {embedder.name} "
+          f"in {time.perf_counter() - t0:.1f}s", flush=True)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reembed", help="copy a collection, re-embedding with EMBEDDER")
+    p.add_argument("--source", default="product_descriptions")
+    p.add_argument("--target", required=True)
+    p.add_argument("--batch-size", type=int, default=256)
+    p.add_argument("--recreate", action="store_true", help="drop target first")
+    p.add_argument("--dimensions", type=int, default=None,
+                   help="shortened OpenAI vectors (default: EMBED_DIMENSIONS / full)")
+
+    p = sub.add_parser("sync", help="MySQL products → PRODUCT_COLLECTION (incremental)")
+    p.add_argument("--batch-size", type=int, default=256, help="texts per embedding call")
+    p.add_argument("--concurrency", type=int, default=4, help="embedding calls in flight")
+    p.add_argument("--prune", action="store_true", help="delete products gone from MySQL")
+    p.add_argument("--full", action="store_true", help="ignore stored hashes, re-embed all")
+
+    args = parser.parse_args()
+    if args.command == "sync":
+        sync_products(batch_size=args.batch_size, concurrency=args.concurrency,
+                      prune=args.prune, full=args.full)
+    elif args.command == "reembed":
+        reembed(args.source, args.target, args.batch_size, args.recreate, args.dimensions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# quantization.py
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8")
+
+
+def l2_normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def truncate_dims(mat: np.ndarray, dims: int | None) -> np.ndarray:
+    """
+    Keep the first `dims` components and re-normalize. For text-embedding-3-*
+    this matches asking the API for `dimensions=dims` (Matryoshka embeddings).
+    """
+    mat = np.asarray(mat, dtype=np.float32)
+    if not dims or dims >= mat.shape[-1]:
+        return mat
+    return l2_normalize(mat[..., :dims])
+
+
+def quantize_int8(mat: np.ndarray):
+    """Symmetric per-vector int8: codes = round(v * 127 / max|v|). Returns (codes, scales)."""
+    mat = np.atleast_2d(np.asarray(mat, dtype=np.float32))
+    peak = np.abs(mat).max(axis=1, keepdims=True)
+    peak[peak == 0] = 1.0
+    scales = (peak / 127.0).astype(np.float32)
+    codes = np.clip(np.rint(mat / scales), -127, 127).astype(np.int8)
+    return codes, scales[:, 0]
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+def int8_dot(codes: np.ndarray, scales: np.ndarray, queries: np.ndarray,
+             chunk_rows: int = 4096) -> np.ndarray:
+    """
+    (n_queries, n_items) dot products against an int8 matrix, upcasting one
+    chunk of rows at a time so the float32 copy never exceeds chunk_rows × dim.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+    for start in range(0, codes.shape[0], chunk_rows):
+        stop = start + chunk_rows
+        block = codes[start:stop].astype(np.float32)
+        out[:, start:stop] = (queries @ block.T) * scales[start:stop]
+    return out
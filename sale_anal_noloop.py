@@ -1,23 +1,23 @@
 from fastapi import FastAPI, Body
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal
 import os
 import json
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from langchain_openai import ChatOpenAI
+from concurrency import run_blocking
+from db import engine
+from discount_rules import load_engine
+from sale_snapshot import SaleSnapshot
 
 # ===============================
 # ENV + DB
 # ===============================
 load_dotenv()
 
-engine = create_engine(
-    f"mysql+pymysql://{os.getenv('DB_USERNAME')}:"
-    f"{os.getenv('DB_PASSWORD')}@"
-    f"{os.getenv('DB_HOST')}/"
-    f"{os.getenv('DB_NAME')}"
-)
-
 # ===============================
 # LLM (NO AGENT – OPTIONAL)
 # ===============================
@@ -35,13 +35,27 @@ app = FastAPI(title="Sale Analysis AI (Final – Rule Based)")
 
 class SaleAnalysisRequest(BaseModel):
     window_days: int = 30
-    high_stock_threshold: int = 30
+    high_stock_threshold: int = Field(30, gt=0)  # rules divide by it
     low_stock_threshold: int = 5
 
 
+class SaleAnalysisPageRequest(SaleAnalysisRequest):
+    tier: Literal["all", "slow", "near_out"] = "all"
+    cursor: int = 0          # last product id of the previous page
+    limit: int = Field(100, ge=1, le=1000)
+
+
+SALE_STREAM_BATCH = int(os.getenv("SALE_STREAM_BATCH", "1000"))
+
+
 # ===============================
 # BUSINESS RULES (CORE)
 # ===============================
+# Declarative rule table, evaluated column-wise (see discount_rules.py).
+# decide_discount_and_reason below stays as the scalar reference.
+discount_rules = load_engine()
+
+
 def decide_discount_and_reason(inventory_qty: int, high: int, low: int):
     """
     Quyết định % sale + reason theo LUẬT CỨNG.
@@ -77,62 +91,191 @@ def decide_discount_and_reason(inventory_qty: int, high: int, low: int):
         )
 
 
+def apply_rules(rows: list[dict], high: int, low: int) -> list[dict]:
+    """Attach recommended_discount / reason_code / reason to each row (vectorized)."""
+    discounts, reason_codes = discount_rules.evaluate(
+        [r["inventory_qty"] for r in rows], high, low)
+    for p, discount, code in zip(rows, discounts.tolist(), reason_codes.tolist()):
+        p["sold_qty"] = int(p["sold_qty"])
+        p["recommended_discount"] = discount
+        p["reason_code"] = discount_rules.reason_key(code)
+        p["reason"] = discount_rules.reason_text(code)
+    return rows
+
+
+# ===============================
+# SQL (ONE PASS)
+# ===============================
+# Tier via CASE + windowed sales / comments joined in → one round trip
+SALE_ANALYSIS_SQL = text("""
+    SELECT p.id, p.name, p.inventory_qty,
+           COALESCE(s.sold_qty, 0) AS sold_qty,
+           COALESCE(cm.comment_count, 0) AS comment_count,
+           CASE WHEN p.inventory_qty <= :low THEN 'near_out'
+                ELSE 'slow' END AS tier
+    FROM product p
+    LEFT JOIN (
+        SELECT oi.product_id, SUM(oi.qty) AS sold_qty
+        FROM order_item oi
+        JOIN `order` o ON o.id = oi.order_id
+        WHERE o.created_date >= :since
+        GROUP BY oi.product_id
+    ) s ON s.product_id = p.id
+    LEFT JOIN (
+        SELECT product_id, COUNT(*) AS comment_count
+        FROM comment
+        WHERE created_date >= :since
+        GROUP BY product_id
+    ) cm ON cm.product_id = p.id
+    WHERE (p.inventory_qty <= :low
+           OR p.inventory_qty >= :high)
+""")
+
+# Paged variant: keyset on p.id, per-row correlated aggregates so one page
+# only touches the sales/comments of its own `limit` products
+SALE_ANALYSIS_PAGE_SQL = """
+    SELECT p.id, p.name, p.inventory_qty,
+           COALESCE((
+               SELECT SUM(oi.qty)
+               FROM order_item oi
+               JOIN `order` o ON o.id = oi.order_id
+               WHERE oi.product_id = p.id AND o.created_date >= :since
+           ), 0) AS sold_qty,
+           (
+               SELECT COUNT(*)
+               FROM comment cm
+               WHERE cm.product_id = p.id AND cm.created_date >= :since
+           ) AS comment_count,
+           CASE WHEN p.inventory_qty <= :low THEN 'near_out'
+                ELSE 'slow' END AS tier
+    FROM product p
+    WHERE {tier_filter}
+      AND p.id > :cursor
+    ORDER BY p.id
+    LIMIT :limit
+"""
+
+TIER_FILTERS = {
+    "all": "(p.inventory_qty <= :low OR p.inventory_qty >= :high)",
+    "slow": "(p.inventory_qty > :low AND p.inventory_qty >= :high)",
+    "near_out": "p.inventory_qty <= :low",
+}
+SALE_ANALYSIS_PAGE_QUERIES = {
+    tier: text(SALE_ANALYSIS_PAGE_SQL.format(tier_filter=flt))
+    for tier, flt in TIER_FILTERS.items()
+}
+
+
+def fetch_sale_rows(window_days: int, high: int, low: int):
+    since = datetime.now() - timedelta(days=window_days)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            SALE_ANALYSIS_SQL,
+            {"high": high, "low": low, "since": since}
+        ).fetchall()
+    return [dict(r._mapping) for r in rows]
+
+
+def fetch_sale_page(window_days: int, high: int, low: int,
+                    tier: str, cursor: int, limit: int):
+    since = datetime.now() - timedelta(days=window_days)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            SALE_ANALYSIS_PAGE_QUERIES[tier],
+            {"high": high, "low": low, "since": since,
+             "cursor": cursor, "limit": limit}
+        ).fetchall()
+    return [dict(r._mapping) for r in rows]
+
+
+def iter_sale_ndjson(window_days: int, high: int, low: int, batch_size: int):
+    """
+    Yield one JSON line per product using a server-side cursor
+    (stream_results + partitions), so memory stays flat for any catalog size.
+    """
+    since = datetime.now() - timedelta(days=window_days)
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(
+            SALE_ANALYSIS_SQL,
+            {"high": high, "low": low, "since": since}
+        )
+        for part in result.partitions(batch_size):
+            for p in apply_rules([dict(r._mapping) for r in part], high, low):
+                yield json.dumps(p, ensure_ascii=False, default=str) + "\n"
+
+
+# ===============================
+# MATERIALIZED SNAPSHOT
+# ===============================
+# Incrementally refreshed in-memory view; /sale-analysis serves from it
+# when the requested window fits, otherwise falls back to the SQL pass.
+SALE_SNAPSHOT_ENABLED = os.getenv("SALE_SNAPSHOT", "1") == "1"
+SALE_SNAPSHOT_MAX_AGE = float(os.getenv("SALE_SNAPSHOT_MAX_AGE", "60"))
+
+sale_snapshot = SaleSnapshot(
+    engine,
+    max_window_days=int(os.getenv("SALE_SNAPSHOT_MAX_WINDOW_DAYS", "90")),
+    updated_at_column=os.getenv("PRODUCT_UPDATED_AT_COLUMN", "updated_at"),
+)
+
+
+def snapshot_rows(window_days: int, high: int, low: int):
+    snap = sale_snapshot
+    stale = (
+        snap.refreshed_at is None
+        or (datetime.now() - snap.refreshed_at).total_seconds() > SALE_SNAPSHOT_MAX_AGE
+    )
+    if stale:
+        snap.refresh()
+    return snap.rows(window_days, high, low), snap.refreshed_at
+
+
+@app.get("/sale-analysis/snapshot")
+def sale_snapshot_stats():
+    return sale_snapshot.stats()
+
+
+@app.post("/sale-analysis/snapshot/refresh")
+def refresh_sale_snapshot(full: bool = False):
+    sale_snapshot.refresh(full=full)
+    return sale_snapshot.stats()
+
+
 @app.post("/sale-analysis")
 async def run_sale_analysis(
     req: SaleAnalysisRequest = Body(default=SaleAnalysisRequest())
 ):
     # ===============================
-    # SQL QUERY
+    # DATA: snapshot if possible, else one SQL pass (off the event loop)
     # ===============================
-    with engine.connect() as conn:
-        slow_rows = conn.execute(
-            text("""
-                SELECT id, name, inventory_qty
-                FROM product
-                WHERE inventory_qty >= :high
-                  AND inventory_qty > :low
-            """),
-            {
-                "high": req.high_stock_threshold,
-                "low": req.low_stock_threshold
-            }
-        ).fetchall()
-
-        near_out_rows = conn.execute(
-            text("""
-                SELECT id, name, inventory_qty
-                FROM product
-                WHERE inventory_qty <= :low
-            """),
-            {"low": req.low_stock_threshold}
-        ).fetchall()
+    snapshot_at = None
+    if SALE_SNAPSHOT_ENABLED and sale_snapshot.covers(req.window_days):
+        rows, snapshot_at = await run_blocking(
+            snapshot_rows,
+            req.window_days,
+            req.high_stock_threshold,
+            req.low_stock_threshold,
+        )
+    else:
+        rows = await run_blocking(
+            fetch_sale_rows,
+            req.window_days,
+            req.high_stock_threshold,
+            req.low_stock_threshold,
+        )
 
     # ===============================
     # APPLY BUSINESS RULES
     # ===============================
     slow_products = []
-    for r in slow_rows:
-        p = dict(r._mapping)
-        discount, reason = decide_discount_and_reason(
-            p["inventory_qty"],
-            req.high_stock_threshold,
-            req.low_stock_threshold
-        )
-        p["recommended_discount"] = discount
-        p["reason"] = reason
-        slow_products.append(p)
-
     near_out_products = []
-    for r in near_out_rows:
-        p = dict(r._mapping)
-        discount, reason = decide_discount_and_reason(
-            p["inventory_qty"],
-            req.high_stock_threshold,
-            req.low_stock_threshold
-        )
-        p["recommended_discount"] = discount
-        p["reason"] = reason
-        near_out_products.append(p)
+    for p in apply_rules(rows, req.high_stock_threshold, req.low_stock_threshold):
+        if p.pop("tier") == "near_out":
+            near_out_products.append(p)
+        else:
+            slow_products.append(p)
 
     # ===============================
     # FINAL REPORT (JSON THUẦN)
@@ -143,4 +286,41 @@ async def run_sale_analysis(
         "discount_control_alerts": []
     }
 
-    return {"report": report}
+    return {
+        "report": report,
+        "source": "snapshot" if snapshot_at else "sql",
+        "snapshot_at": snapshot_at.isoformat() if snapshot_at else None,
+    }
+
+
+@app.post("/sale-analysis/page")
+async def run_sale_analysis_page(req: SaleAnalysisPageRequest):
+    """Keyset-paginated report: pass back `next_cursor` until it is null."""
+    rows = await run_blocking(
+        fetch_sale_page,
+        req.window_days,
+        req.high_stock_threshold,
+        req.low_stock_threshold,
+        req.tier,
+        req.cursor,
+        req.limit,
+    )
+    items = apply_rules(rows, req.high_stock_threshold, req.low_stock_threshold)
+    next_cursor = items[-1]["id"] if len(items) == req.limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.post("/sale-analysis/stream")
+def run_sale_analysis_stream(
+    req: SaleAnalysisRequest = Body(default=SaleAnalysisRequest())
+):
+    """NDJSON: one product per line (with its `tier`), streamed from a server-side cursor."""
+    return StreamingResponse(
+        iter_sale_ndjson(
+            req.window_days,
+            req.high_stock_threshold,
+            req.low_stock_threshold,
+            SALE_STREAM_BATCH,
+        ),
+        media_type="application/x-ndjson",
+    )
@@ -1,25 +1,28 @@
 from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 from langchain_openai import ChatOpenAI
-from langchain_community.utilities.sql_database import SQLDatabase
+from langchain_core.messages import SystemMessage
 from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langgraph.prebuilt import create_react_agent
+from concurrency import run_blocking
+from db import engine
+from lazy import Lazy
+from schema_cache import CachedSQLDatabase
+from jobs import JobManager, QueueFullError
+from agent_metrics import UsageTracker, agent_metrics
+from token_budget import budget_tools, trim_history
+from logs import Timer, get_logger, log_event
 
 # ==================================================
 # ENV + DB
 # ==================================================
 load_dotenv()
 
-engine = create_engine(
-    f"mysql+pymysql://{os.getenv('DB_USERNAME')}:"
-    f"{os.getenv('DB_PASSWORD')}@"
-    f"{os.getenv('DB_HOST')}/"
-    f"{os.getenv('DB_NAME')}"
-)
+log = get_logger("sale_analysis")
 
 # 🔐 CHỈ CÁC BẢNG TỐI THIỂU CHO SALE ANALYSIS
 allowed_tables = [
@@ -36,17 +39,19 @@ allowed_tables = [
     "image_item",
 ]
 
-db = SQLDatabase(engine, include_tables=allowed_tables)
 
-# ==================================================
-# LLM
-# ==================================================
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-)
+# 🐢 Reflection + snapshot (per-table sample rows) on first use, not at import
+def _build_db():
+    db = CachedSQLDatabase(
+        engine,
+        include_tables=allowed_tables,
+        schema_ttl_seconds=float(os.getenv("SCHEMA_CACHE_TTL", "3600")),
+    )
+    db.build_snapshot()
+    return db
+
 
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+sql_db = Lazy(_build_db, "sale_schema")
 
 # ==================================================
 # SYSTEM PROMPT – SALE ANALYST AI
@@ -120,11 +125,30 @@ NGÔN NGỮ:
 # ==================================================
 # AGENT
 # ==================================================
-agent_executor = create_react_agent(
-    llm,
-    toolkit.get_tools(),
-    prompt=SYSTEM_PROMPT
-)
+def build_prompt(state):
+    # ✂️ older tool results shrink once the history exceeds HISTORY_MAX_TOKENS
+    return [SystemMessage(content=SYSTEM_PROMPT)] + trim_history(state["messages"])
+
+
+def _build_agent():
+    db = sql_db.get()
+
+    # LLM
+    llm = ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+    )
+
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+
+    return create_react_agent(
+        llm,
+        budget_tools(toolkit.get_tools(), db),
+        prompt=build_prompt
+    )
+
+
+agent_executor = Lazy(_build_agent, "sale_agent")
 
 # ==================================================
 # FASTAPI APP
@@ -138,20 +162,14 @@ class SaleAnalysisRequest(BaseModel):
     low_stock_threshold: int = 5
 
 
-@app.post("/sale-analysis")
-async def run_sale_analysis(
-    req: SaleAnalysisRequest = Body(default=SaleAnalysisRequest())
-):
-    """
-    Admin triggers sale analysis.
-    No user question needed.
-    """
+async def analyze(window_days: int, high_stock_threshold: int, low_stock_threshold: int):
+    """Run the ReAct sale analyst once and return its final answer."""
 
     analysis_task = f"""
-    Phân tích tình trạng sản phẩm trong {req.window_days} ngày gần nhất.
+    Phân tích tình trạng sản phẩm trong {window_days} ngày gần nhất.
 
-    HIGH_STOCK_THRESHOLD = {req.high_stock_threshold}
-    LOW_STOCK_THRESHOLD = {req.low_stock_threshold}
+    HIGH_STOCK_THRESHOLD = {high_stock_threshold}
+    LOW_STOCK_THRESHOLD = {low_stock_threshold}
 
     Hãy:
     - Xác định sản phẩm SLOW-MOVING
@@ -159,16 +177,73 @@ async def run_sale_analysis(
     - Phát hiện các trường hợp DISCOUNT nguy hiểm
     """
 
-    events = agent_executor.stream(
+    usage = UsageTracker()
+    executor = await run_blocking(agent_executor.get)  # built on the first run
+    events = executor.astream(
         {"messages": [("user", analysis_task)]},
         stream_mode="values",
+        config={"callbacks": [agent_metrics, usage]},
     )
 
+    timer = Timer()
     final_answer = None
-    for event in events:
+    async for event in events:
         final_answer = event["messages"][-1].content
-        print(final_answer)
+    log_event(log, "sale_analysis_answer", sample=False, ms=timer.ms,
+              window_days=window_days, answer=final_answer, **usage.summary())
+
+    return final_answer
+
+
+@app.post("/sale-analysis")
+async def run_sale_analysis(
+    req: SaleAnalysisRequest = Body(default=SaleAnalysisRequest())
+):
+    """
+    Admin triggers sale analysis.
+    No user question needed.
+    """
 
     return {
-        "report": final_answer
+        "report": await analyze(**req.model_dump())
     }
+
+
+# ==================================================
+# BACKGROUND JOBS (POST → job_id, GET → poll)
+# ==================================================
+jobs = JobManager(
+    max_workers=int(os.getenv("SALE_JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("SALE_JOB_MAX_PENDING", "20")),
+    ttl_seconds=float(os.getenv("SALE_JOB_TTL", "3600")),
+)
+
+
+@app.post("/sale-analysis/jobs", status_code=202)
+async def submit_sale_analysis_job(
+    req: SaleAnalysisRequest = Body(default=SaleAnalysisRequest())
+):
+    """Queue an analysis run; identical in-flight params share one job."""
+    try:
+        return jobs.submit(req.model_dump(), analyze)
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "message": "Too many pending jobs", "details": str(e)},
+        )
+
+
+@app.get("/sale-analysis/jobs/{job_id}")
+async def get_sale_analysis_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Job not found or expired"},
+        )
+    return job
+
+
+@app.get("/sale-analysis/jobs")
+async def sale_analysis_job_stats():
+    return jobs.stats()
@@ -0,0 +1,228 @@
+# sale_snapshot.py
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, inspect, text
+
+
+class SaleSnapshot:
+    """
+    In-memory materialized view for rule-based sale analysis:
+    per-product inventory + daily sales / comment buckets.
+
+    The first refresh loads everything inside `max_window_days`; later
+    refreshes only pull rows past the watermarks:
+      - order_item.id / comment.id (append-only). Each refresh reads up to
+        the MAX(id) taken at its start, and re-scans the last `id_lag` ids
+        so a transaction that commits a lower id late is still counted
+        (ids already applied are skipped).
+      - product.<updated_at_column> (>= the watermark, so same-second
+        updates are re-read) for names, if the column exists, else a
+        product re-read (id, name, inventory_qty only). The column must be
+        maintained by the database (MySQL: `DEFAULT CURRENT_TIMESTAMP ON
+        UPDATE CURRENT_TIMESTAMP`), or renames are missed until a full refresh.
+      - every refresh also re-reads the narrow (id, inventory_qty) set, so
+        deleted products drop out and stock changes that don't touch
+        updated_at are still picked up
+    Sales/comments are bucketed per day, so window_days is applied at day
+    granularity.
+    """
+
+    def __init__(self, engine, max_window_days: int = 90,
+                 updated_at_column: str = "updated_at", id_lag: int = 1000):
+        self.engine = engine
+        self.max_window_days = max_window_days
+        self.updated_at_column = updated_at_column
+        self.id_lag = id_lag
+        self._lock = threading.Lock()
+
+        self.products: dict[int, tuple[str, int]] = {}
+        self.sales: dict[tuple[int, int], int] = defaultdict(int)      # (product_id, day) → qty
+        self.comments: dict[tuple[int, int], int] = defaultdict(int)   # (product_id, day) → count
+
+        self.last_order_item_id = 0
+        self.last_comment_id = 0
+        # ids inside the re-scan margin that were already applied
+        self._seen_order_item_ids: set[int] = set()
+        self._seen_comment_ids: set[int] = set()
+        self.product_watermark = None
+        self._has_updated_at = None
+        self.refreshed_at = None
+        self.refresh_seconds = None
+
+    @staticmethod
+    def _day(value) -> int:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime):
+            value = value.date()
+        return value.toordinal()
+
+    def _detect_updated_at(self, conn) -> bool:
+        cols = {c["name"] for c in inspect(conn).get_columns("product")}
+        return self.updated_at_column in cols
+
+    def refresh(self, full: bool = False):
+        """Apply rows changed since the last watermark (or reload everything)."""
+        t0 = time.perf_counter()
+        with self._lock, self.engine.connect() as conn:
+            first = full or self.refreshed_at is None
+            if self._has_updated_at is None:
+                self._has_updated_at = self._detect_updated_at(conn)
+            since = datetime.now() - timedelta(days=self.max_window_days)
+
+            # ---- products ----
+            if first or not self._has_updated_at:
+                cols = "id, name, inventory_qty"
+                if self._has_updated_at:
+                    cols += f", `{self.updated_at_column}` AS updated_at"
+                rows = conn.execute(text(f"SELECT {cols} FROM product")).fetchall()
+                self.products = {r.id: (r.name, int(r.inventory_qty or 0)) for r in rows}
+            else:
+                rows = conn.execute(
+                    text(f"""
+                        SELECT id, name, inventory_qty,
+                               `{self.updated_at_column}` AS updated_at
+                        FROM product
+                        WHERE `{self.updated_at_column}` >= :wm
+                    """),
+                    {"wm": self.product_watermark},
+                ).fetchall()
+                # rows at exactly the watermark come back again: re-applying is a no-op
+                for r in rows:
+                    self.products[r.id] = (r.name, int(r.inventory_qty or 0))
+                self._sync_inventory(conn)
+            if self._has_updated_at and rows:
+                newest = max(r.updated_at for r in rows if r.updated_at is not None)
+                if self.product_watermark is None or newest > self.product_watermark:
+                    self.product_watermark = newest
+
+            # ---- sales (order_item ⨝ order) ----
+            if first:
+                self.sales = defaultdict(int)
+                self.comments = defaultdict(int)
+                self.last_order_item_id = 0
+                self.last_comment_id = 0
+                self._seen_order_item_ids = set()
+                self._seen_comment_ids = set()
+
+            # upper bound first: rows inserted while we read wait for the next refresh
+            hi_order_item = conn.execute(
+                text("SELECT COALESCE(MAX(id), 0) FROM order_item")).scalar()
+            hi_comment = conn.execute(
+                text("SELECT COALESCE(MAX(id), 0) FROM comment")).scalar()
+
+            sale_rows = conn.execute(
+                text("""
+                    SELECT oi.id, oi.product_id, oi.qty, o.created_date
+                    FROM order_item oi
+                    JOIN `order` o ON o.id = oi.order_id
+                    WHERE oi.id > :lo AND oi.id <= :hi AND o.created_date >= :since
+                """),
+                {"lo": max(self.last_order_item_id - self.id_lag, 0),
+                 "hi": hi_order_item, "since": since},
+            ).fetchall()
+            for r in sale_rows:
+                if r.id in self._seen_order_item_ids:
+                    continue
+                self._seen_order_item_ids.add(r.id)
+                self.sales[(r.product_id, self._day(r.created_date))] += int(r.qty or 0)
+
+            comment_rows = conn.execute(
+                text("""
+                    SELECT id, product_id, created_date
+                    FROM comment
+                    WHERE id > :lo AND id <= :hi AND created_date >= :since
+                """),
+                {"lo": max(self.last_comment_id - self.id_lag, 0),
+                 "hi": hi_comment, "since": since},
+            ).fetchall()
+            for r in comment_rows:
+                if r.id in self._seen_comment_ids:
+                    continue
+                self._seen_comment_ids.add(r.id)
+                self.comments[(r.product_id, self._day(r.created_date))] += 1
+
+            # watermark = the bound we read up to (whole table, not just the
+            # window, so rows older than the window are never re-read)
+            self.last_order_item_id = hi_order_item
+            self.last_comment_id = hi_comment
+            self._seen_order_item_ids = {
+                i for i in self._seen_order_item_ids if i > hi_order_item - self.id_lag}
+            self._seen_comment_ids = {
+                i for i in self._seen_comment_ids if i > hi_comment - self.id_lag}
+
+            self._prune(date.today().toordinal() - self.max_window_days)
+            self.refreshed_at = datetime.now()
+            self.refresh_seconds = round(time.perf_counter() - t0, 4)
+
+    def _sync_inventory(self, conn):
+        """Current stock for every product; drop deleted ones, load unseen ones."""
+        stock = {r.id: int(r.inventory_qty or 0) for r in conn.execute(
+            text("SELECT id, inventory_qty FROM product")).fetchall()}
+        self.products = {pid: (name, stock[pid])
+                         for pid, (name, _) in self.products.items() if pid in stock}
+        unseen = [pid for pid in stock if pid not in self.products]
+        if unseen:
+            # e.g. inserted with an explicit, older updated_at
+            rows = conn.execute(
+                text("SELECT id, name, inventory_qty FROM product WHERE id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+                {"ids": unseen},
+            ).fetchall()
+            for r in rows:
+                self.products[r.id] = (r.name, int(r.inventory_qty or 0))
+
+    def _prune(self, oldest_day: int):
+        for buckets in (self.sales, self.comments):
+            for key in [k for k in buckets if k[1] < oldest_day]:
+                del buckets[key]
+
+    def covers(self, window_days: int) -> bool:
+        return window_days <= self.max_window_days
+
+    def rows(self, window_days: int, high: int, low: int) -> list[dict]:
+        """Same columns as SALE_ANALYSIS_SQL: id, name, inventory_qty, sold_qty, comment_count, tier."""
+        since_day = date.today().toordinal() - window_days
+        with self._lock:
+            sold = defaultdict(int)
+            for (pid, day), qty in self.sales.items():
+                if day >= since_day:
+                    sold[pid] += qty
+            commented = defaultdict(int)
+            for (pid, day), count in self.comments.items():
+                if day >= since_day:
+                    commented[pid] += count
+
+            out = []
+            for pid, (name, inv) in self.products.items():
+                if inv <= low:
+                    tier = "near_out"
+                elif inv >= high:
+                    tier = "slow"
+                else:
+                    continue
+                out.append({
+                    "id": pid,
+                    "name": name,
+                    "inventory_qty": inv,
+                    "sold_qty": sold.get(pid, 0),
+                    "comment_count": commented.get(pid, 0),
+                    "tier": tier,
+                })
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self.products),
+            "sales_buckets": len(self.sales),
+            "comment_buckets": len(self.comments),
+            "last_order_item_id": self.last_order_item_id,
+            "last_comment_id": self.last_comment_id,
+            "product_watermark": str(self.product_watermark) if self.product_watermark else None,
+            "incremental_products": bool(self._has_updated_at),
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "refresh_seconds": self.refresh_seconds,
+        }
@@ -0,0 +1,100 @@
+# schema_cache.py
+import json
+import threading
+import time
+
+from langchain_community.utilities.sql_database import SQLDatabase
+
+from shared_cache import safe_call, shared_key
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase whose `get_table_info` is served from a versioned snapshot.
+    The agent's sql_db_schema tool normally re-introspects MySQL and pulls
+    sample rows on every call; here each table is rendered once and reused
+    until the TTL expires or `invalidate()` is called.
+    With `shared` (see shared_cache.py) a snapshot rendered by one worker is
+    published for the others, which adopt it instead of re-rendering.
+    """
+
+    def __init__(self, *args, schema_ttl_seconds: float = 3600, shared=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.schema_ttl_seconds = schema_ttl_seconds
+        self.shared = shared
+        self._schema_lock = threading.Lock()
+        self._build_lock = threading.Lock()  # one (re)build at a time
+        self._snapshot: dict[str, str] = {}
+        self.schema_version = 0
+        self.schema_built_at = None
+
+    def build_snapshot(self) -> dict[str, str]:
+        """(Re)render table info for every usable table and bump the version."""
+        tables = sorted(self.get_usable_table_names())
+        snapshot = {t: super(CachedSQLDatabase, self).get_table_info([t])
+                    for t in tables}
+        built_at = time.time()
+        self._set_snapshot(snapshot, built_at)
+        if self.shared is not None and self.schema_ttl_seconds >= 1:
+            safe_call(self.shared.set, self._shared_key(),
+                      json.dumps({"built_at": built_at, "tables": snapshot}),
+                      ex=int(self.schema_ttl_seconds))
+        print(f"🗂️ Schema snapshot v{self.schema_version}: {len(snapshot)} tables",
+              flush=True)
+        return snapshot
+
+    def load_snapshot(self) -> dict[str, str]:
+        """Adopt the snapshot another worker published, else build (and publish) one."""
+        raw = safe_call(self.shared.get, self._shared_key()) if self.shared is not None else None
+        if raw is None:
+            return self.build_snapshot()
+        data = json.loads(raw)
+        self._set_snapshot(data["tables"], data["built_at"])
+        print(f"🗂️ Schema snapshot v{self.schema_version}: {len(data['tables'])} tables "
+              "(shared)", flush=True)
+        return data["tables"]
+
+    def _shared_key(self) -> str:
+        return shared_key("schema", *sorted(self.get_usable_table_names()))
+
+    def _set_snapshot(self, snapshot: dict[str, str], built_at: float):
+        with self._schema_lock:
+            self._snapshot = snapshot
+            self.schema_version += 1
+            self.schema_built_at = built_at
+
+    def invalidate(self):
+        with self._schema_lock:
+            self._snapshot = {}
+            self.schema_built_at = None
+
+    def _expired(self) -> bool:
+        return (
+            self.schema_built_at is None
+            or time.time() - self.schema_built_at > self.schema_ttl_seconds
+        )
+
+    def _current_snapshot(self) -> dict[str, str]:
+        if self._expired():
+            with self._build_lock:
+                # threads that waited here reuse the snapshot the first one built
+                if self._expired():
+                    return self.load_snapshot()
+        return self._snapshot
+
+    def get_table_info(self, table_names=None) -> str:
+        snapshot = self._current_snapshot()
+        names = list(snapshot) if table_names is None else table_names
+        if any(n not in snapshot for n in names):
+            # unknown table → let SQLDatabase raise its usual error
+            return super().get_table_info(table_names)
+        # same output format as SQLDatabase: sorted, blank-line separated
+        return "\n\n".join(sorted(snapshot[n] for n in names))
+
+    def schema_stats(self) -> dict:
+        return {
+            "version": self.schema_version,
+            "built_at": self.schema_built_at,
+            "ttl_seconds": self.schema_ttl_seconds,
+            "tables": sorted(self._snapshot),
+        }
@@ -0,0 +1,258 @@
+# shared_cache.py
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from logs import get_logger
+
+# 🔗 Cache tier shared by every uvicorn / gunicorn worker on the host, behind
+# the in-process LRUs (embeddings, answers, schema snapshot).
+#   SHARED_CACHE_URL=""                  → off: each worker only has its own caches
+#   SHARED_CACHE_URL=sqlite://           → SQLite file in /dev/shm (RAM) or the temp dir
+#   SHARED_CACHE_URL=sqlite:////abs/path → SQLite file at that path
+#   SHARED_CACHE_URL=redis://host:6379/0 → Redis (pip install redis), same interface
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "100000"))
+# while the backend is down every request fails several calls → one warning
+# per operation per interval (the rest are counted in "suppressed")
+SHARED_CACHE_WARN_SECONDS = float(os.getenv("SHARED_CACHE_WARN_SECONDS", "30"))
+
+log = get_logger("shared_cache")
+_warned: dict[str, list] = {}  # operation → [last warning (monotonic), suppressed]
+
+
+class SQLiteCache:
+    """
+    The subset of the Redis API our caches use — get, set(ex=, nx=), delete,
+    incr, ttl, scan_iter, dbsize — on one SQLite file in WAL mode, so any number
+    of worker processes can share it and readers never block writers.
+    Values come back as bytes, like redis-py without decode_responses.
+    Expired rows are skipped on read; every `prune_every` writes they are
+    purged, along with the least recently written rows above `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, prune_every: int = 500):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._local = threading.local()  # one connection per thread
+        self._writes = 0
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                written_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS kv_written_at ON kv (written_at);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; busy timeout covers short write-lock waits between workers
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # it's a cache: losing it is fine
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bytes(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, (int, float)):
+            value = str(value)
+        return value.encode("utf-8")
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return bytes(row[0])
+
+    def set(self, key: str, value, ex: int | None = None, nx: bool = False):
+        now = time.time()
+        expires_at = now + ex if ex else None
+        args = (key, self._bytes(value), expires_at, now)
+        if nx:
+            # only if missing or expired (SET NX)
+            cur = self._conn().execute("""
+                INSERT INTO kv (key, value, expires_at, written_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                    expires_at = excluded.expires_at, written_at = excluded.written_at
+                WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?
+            """, args + (now,))
+            if not cur.rowcount:
+                return None
+        else:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at, written_at) "
+                "VALUES (?, ?, ?, ?)", args)
+        self._after_write()
+        return True
+
+    def delete(self, *keys) -> int:
+        if not keys:
+            return 0
+        keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+        cur = self._conn().execute(
+            f"DELETE FROM kv WHERE key IN ({','.join('?' * len(keys))})", keys)
+        return cur.rowcount
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.get(key)
+            value = int(current or 0) + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at, written_at) "
+                "VALUES (?, ?, NULL, ?)", (key, self._bytes(value), time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def scan_iter(self, match: str = "*", count: int = 1000):
+        # GLOB uses the same * ? [..] patterns as Redis MATCH
+        rows = self._conn().execute(
+            "SELECT key FROM kv WHERE key GLOB ? AND (expires_at IS NULL OR expires_at > ?)",
+            (match, time.time())).fetchall()
+        for (key,) in rows:
+            yield key
+
+    def ttl(self, key: str) -> int:
+        """Seconds left, -1 if the key never expires, -2 if missing (Redis TTL)."""
+        row = self._conn().execute(
+            "SELECT expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return -2
+        if row[0] is None:
+            return -1
+        left = row[0] - time.time()
+        return int(left) if left > 0 else -2
+
+    def dbsize(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.prune_every:
+            return
+        conn = self._conn()
+        conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                     (time.time(),))
+        excess = self.dbsize() - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM kv WHERE key IN "
+                         "(SELECT key FROM kv ORDER BY written_at LIMIT ?)", (excess,))
+
+
+def connect(url: str | None = None):
+    """Shared cache client for `url` (default SHARED_CACHE_URL), or None when off."""
+    url = SHARED_CACHE_URL if url is None else url
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("SHARED_CACHE_URL=redis://… needs `pip install redis`") from e
+        return redis.Redis.from_url(url)
+    if url.startswith("sqlite://"):
+        # same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////abs.db
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+        if not path:
+            base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = os.path.join(base, "billshop_cache.sqlite")
+        return SQLiteCache(path, max_entries=SHARED_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL: {url}")
+
+
+class ProcessSharedCache:
+    """
+    Stand-in for the client that connects on first use, and again in every
+    process that uses it: with `gunicorn --preload` the app is imported
+    before the fork, and a SQLite connection (or Redis socket) must not be
+    inherited by the workers.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._client = connect(self.url)
+                    self._pid = pid
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        # resolved on call, so a failed connect happens inside safe_call()
+        def method(*args, **kwargs):
+            return getattr(self.client(), name)(*args, **kwargs)
+        method.__name__ = name
+        return method
+
+
+def digest(*parts: str) -> str:
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def shared_key(prefix: str, *parts: str) -> str:
+    """Fixed-length key: user text (emails, questions) never needs escaping."""
+    return f"{prefix}:{digest(*parts)}"
+
+
+def safe_call(method, *args, default=None, **kwargs):
+    """The shared tier is an optimization: errors are logged and count as a miss."""
+    try:
+        return method(*args, **kwargs)
+    except Exception as e:
+        op = getattr(method, "__name__", str(method))
+        now = time.monotonic()
+        state = _warned.setdefault(op, [None, 0])
+        if state[0] is not None and now - state[0] < SHARED_CACHE_WARN_SECONDS:
+            state[1] += 1
+        else:
+            log.warning("shared_cache_error", exc_info=e,
+                        extra={"fields": {"op": op, "suppressed": state[1]}})
+            state[0], state[1] = now, 0
+        return default
+
+
+def remaining_ttl(cache, key: str, default: float) -> float:
+    """Seconds `key` has left in the shared tier, capped at `default`."""
+    left = safe_call(cache.ttl, key, default=-1)
+    return min(left, default) if left is not None and left >= 0 else default
+
+
+def describe(cache) -> dict:
+    if cache is None:
+        return {"backend": None}
+    if isinstance(cache, ProcessSharedCache):
+        cache = safe_call(cache.client)
+        if cache is None:
+            return {"backend": None, "error": "connect failed"}
+    if isinstance(cache, SQLiteCache):
+        return {"backend": "sqlite", "path": cache.path,
+                "entries": safe_call(cache.dbsize), "max_entries": cache.max_entries}
+    return {"backend": type(cache).__name__, "entries": safe_call(cache.dbsize)}
+
+
+# one client per process, opened lazily (SQLite connections are per thread too)
+shared_cache = ProcessSharedCache(SHARED_CACHE_URL) if SHARED_CACHE_URL else None
@@ -1,13 +1,21 @@
+import os
+import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langgraph.prebuilt import create_react_agent
-from langchain import hub
+from concurrency import run_blocking
+from db import engine
+from answer_cache import AnswerCache, PUBLIC_SCOPE
+import intent_router
+from order_access import OrderAccess, extract_order_ids, mentions_order, missing_indexes
+from metrics import span
+from agent_metrics import UsageTracker, agent_metrics
+from hub_prompt import load_hub_prompt
+from lazy import Lazy, warm_up
+from shared_cache import shared_cache
+from logs import Timer, get_logger, log_event
 # py -m pip install fastapi uvicorn python-slugify chromadb SQLAlchemy PyMySQL langchain langchain-core langchain-community langchain-openai langgraph openai tiktoken python-dotenv aiohttp requests pydantic
 
 # uvicorn sql_agent:app --reload --port 5068
@@ -18,10 +26,7 @@ from langchain import hub
 # Load environment variables
 load_dotenv()
 
-# DB connection
-engine = create_engine(
-    f"mysql+pymysql://{os.getenv('DB_USERNAME')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
-)
+log = get_logger("sql")
 
 allowed_tables = [
     "order",
@@ -37,37 +42,163 @@ allowed_tables = [
     "image_item",
 ]
 
-db = SQLDatabase(engine, include_tables=allowed_tables)
-
-# LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-# Toolkit
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-
-# System prompt
-# System prompt
-prompt_template = hub.pull("langchain-ai/sql-agent-system-prompt")
-system_message = (
-    prompt_template.format(dialect="MySQL", top_k=5)
-    + "\n\nIMPORTANT RULES:\n"
-      "You are a SQL agent with  access to a SQL database of a badminton store.\n"
-      "1. You are ONLY allowed to execute SELECT queries.\n"
-      "2. For UPDATE/DELETE/INSERT/ALTER/DROP/CREATE or any DML/DDL queries, "
-      "you must refuse and explain that only read-only access is permitted.\n"
-      "3. Never attempt to change the database state.\n"
-      "4. If the user asks for modifications, respond with a polite refusal."
-      "5. Answers must be in Vietnamese."
-      "6. If there is no relevant request like consult, policy, respond with ''"
+# 🗂️ Schema snapshot built once (first use / warm-up), refreshed by TTL or /schema/refresh
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "3600"))
+# Put the snapshot straight into the system prompt → skips list_tables/schema tool turns
+SCHEMA_IN_PROMPT = os.getenv("SCHEMA_IN_PROMPT", "0") == "1"
+# Build schema + agent in the background as soon as the worker starts
+WARM_UP = os.getenv("WARM_UP", "1") == "1"
+
+# 🐢 Heavy objects (schema reflection, LangChain / LangGraph imports, agent
+# graph) are built on first use or by the lifespan warm-up, never at import:
+# a worker comes up in well under a second, without MySQL or network.
+
+
+def _build_db():
+    from schema_cache import CachedSQLDatabase
+
+    db = CachedSQLDatabase(
+        engine, include_tables=allowed_tables, schema_ttl_seconds=SCHEMA_CACHE_TTL,
+        shared=shared_cache)
+    db.load_snapshot()  # another worker's snapshot if there is one
+    return db
+
+
+sql_db = Lazy(_build_db, "sql_schema")
+
+# System prompt (hub prompt from the on-disk cache / vendored copy, see hub_prompt.py)
+SQL_AGENT_RULES = (
+    "\n\nIMPORTANT RULES:\n"
+    "You are a SQL agent with  access to a SQL database of a badminton store.\n"
+    "1. You are ONLY allowed to execute SELECT queries.\n"
+    "2. For UPDATE/DELETE/INSERT/ALTER/DROP/CREATE or any DML/DDL queries, "
+    "you must refuse and explain that only read-only access is permitted.\n"
+    "3. Never attempt to change the database state.\n"
+    "4. If the user asks for modifications, respond with a polite refusal."
+    "5. Answers must be in Vietnamese."
+    "6. If there is no relevant request like consult, policy, respond with ''"
+)
+
+
+_schema_prompt = {"version": None, "text": ""}
+
+
+def schema_for_prompt() -> str:
+    from token_budget import SCHEMA_MAX_TOKENS, truncate_tokens
+
+    # truncated once per schema snapshot, not on every ReAct step
+    db = sql_db.get()
+    if _schema_prompt["version"] != db.schema_version:
+        _schema_prompt["text"] = truncate_tokens(db.get_table_info(), SCHEMA_MAX_TOKENS)
+        _schema_prompt["version"] = db.schema_version
+    return _schema_prompt["text"]
+
+
+def _build_agent():
+    from langchain_openai import ChatOpenAI
+    from langchain_core.messages import SystemMessage
+    from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+    from langgraph.prebuilt import create_react_agent
+    from token_budget import budget_tools, trim_history
+
+    db = sql_db.get()
+    system_message = load_hub_prompt(
+        "langchain-ai/sql-agent-system-prompt", dialect="MySQL", top_k=5) + SQL_AGENT_RULES
+
+    # LLM
+    # stream_usage → token counts are reported for streamed runs too (/metrics)
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, stream_usage=True)
+
+    # Toolkit
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+
+    def build_prompt(state):
+        content = system_message
+        if SCHEMA_IN_PROMPT:
+            content += (
+                "\n\nDATABASE SCHEMA (already loaded, do NOT call "
+                "sql_db_list_tables or sql_db_schema):\n" + schema_for_prompt()
+            )
+        # ✂️ older tool results shrink once the history exceeds HISTORY_MAX_TOKENS
+        return [SystemMessage(content=content)] + trim_history(state["messages"])
+
+    # Agent (sql_db_query → capped CSV, sql_db_schema → capped text)
+    return create_react_agent(
+        llm, budget_tools(toolkit.get_tools(), db), prompt=build_prompt)
+
+
+agent_executor = Lazy(_build_agent, "sql_agent")
+
+# ♻️ Answer cache (exact normalized question, optional embedding similarity)
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "0") == "1"
+ANSWER_CACHE_EMBED_MODEL = os.getenv(
+    "ANSWER_CACHE_EMBED_MODEL", "text-embedding-3-small")
+
+
+def _openai_client():
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+oa = Lazy(_openai_client, "openai_client")
+
+
+def _embed_question(text_: str):
+    emb = oa.get().embeddings.create(model=ANSWER_CACHE_EMBED_MODEL, input=text_)
+    return emb.data[0].embedding
+
+
+answer_cache = AnswerCache(
+    max_size=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "600")),
+    embed_fn=_embed_question if ANSWER_CACHE_SEMANTIC else None,
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+    shared=shared_cache,
 )
 
+# 🚀 Deterministic fast path for common intents (skip the ReAct agent)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") == "1"
+
+# 🔒 Order ownership guard (short-TTL cache of verified order/email pairs)
+order_access = OrderAccess(
+    engine, ttl_seconds=float(os.getenv("ORDER_ACCESS_TTL", "120")))
+
+
+def _check_order_indexes():
+    missing = missing_indexes(engine)
+    for table, column, name in missing:
+        print(f"⚠️ Missing index on {table}.{column} → run: py order_access.py --create",
+              flush=True)
+    return missing
+
+
+order_indexes = Lazy(_check_order_indexes, "order_index_check")
+
+
+# everything /sql needs before it can answer without a cold start
+STARTUP_LAZIES = [order_indexes, sql_db, agent_executor] + ([oa] if ANSWER_CACHE_SEMANTIC else [])
+
+
+def start_warm_up():
+    """Background build of STARTUP_LAZIES (own lifespan, or the gateway's)."""
+    return warm_up(*STARTUP_LAZIES, name="sql-warm-up")
+
+
+def startup_stats() -> dict:
+    return {lazy.name: lazy.stats() for lazy in STARTUP_LAZIES}
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    # only runs when served directly; main_api starts it for the mounted app
+    if WARM_UP:
+        start_warm_up()
+    yield
 
-# Agent
-agent_executor = create_react_agent(
-    llm, toolkit.get_tools(), prompt=system_message)
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Request body schema
 
@@ -78,54 +209,179 @@ class QueryRequest(BaseModel):
     top_product: str | None = None
 
 
-@app.post("/sql")
-async def run_sql_agent(req: QueryRequest):
-    """Run SQL agent with a user query and return AI answer."""
+@app.get("/schema")
+def schema_stats():
+    return sql_db.get().schema_stats()
+
+
+@app.post("/schema/refresh")
+def refresh_schema():
+    db = sql_db.get()
+    db.build_snapshot()
+    return db.schema_stats()
+
+
+@app.get("/startup")
+def startup_status():
+    return startup_stats()
+
+
+@app.get("/answer_cache")
+def answer_cache_stats():
+    return answer_cache.stats()
+
+
+@app.post("/answer_cache/invalidate")
+def invalidate_answer_cache(scope: str | None = None):
+    """Hook for product/policy updates: drop all cached answers (or one scope)."""
+    return {"removed": answer_cache.invalidate(scope)}
+
+
+async def prepare_query(req: QueryRequest):
+    """
+    Shared pre-agent steps for /sql and /sql/stream.
+    Returns (early_response, ctx): early_response is a final answer dict
+    (guard refusal or cache hit); otherwise ctx holds what the agent run needs.
+    """
 
    # ✅ Build richer query context for LLM
     user_query = req.query
     if req.top_product:
         user_query += f"\n(Sản phẩm được quan tâm: {req.top_product})"
 
-    print("🧩 Final SQL Agent query:", user_query)
+    log_event(log, "sql_agent_query", query=user_query)
 
-    lowered = req.query.lower()
+    personal = mentions_order(req.query)
 
     # 🔒 Rule: if query mentions orders
-    if "order" in lowered or "đơn" in lowered:
-        print("email", req.email)
+    if personal:
         if not req.email or req.email.strip() == '':
-            return {"answer": "❌ Bạn cần đăng nhập (cung cấp email) để xem thông tin đơn hàng."}
-
-        # Try to detect an order ID (e.g., "1234")
-        import re
-        order_id_match = re.search(r"\b\d+\b", req.query)
-        if order_id_match:
-            order_id = order_id_match.group(0)
-
-            with engine.connect() as conn:
-                result = conn.execute(
-                    text("""
-                        SELECT o.id
-                        FROM `order` o
-                        JOIN customer c ON o.customer_id = c.id
-                        WHERE o.id = :order_id AND c.email = :email
-                    """),
-                    {"order_id": order_id, "email": req.email}
-                ).fetchone()
-
-            if not result:
-                return {"answer": f"❌ Không tìm thấy đơn hàng #{order_id} thuộc về email {req.email}."}
-
-    events = agent_executor.stream(
-        {"messages": [("user", user_query)]},
+            return {"answer": "❌ Bạn cần đăng nhập (cung cấp email) để xem thông tin đơn hàng."}, None
+
+        # Detect order IDs (e.g., "1234") → one cached IN (...) ownership check
+        order_ids = extract_order_ids(req.query)
+        if order_ids:
+            owned = await run_blocking(order_access.owned_orders, req.email, order_ids)
+            not_owned = [oid for oid in order_ids if oid not in owned]
+
+            if not_owned:
+                ids = ", ".join(f"#{oid}" for oid in not_owned)
+                return {"answer": f"❌ Không tìm thấy đơn hàng {ids} thuộc về email {req.email}."}, None
+
+    # 🚀 Fast path: order status / price / stock / brand & category lists
+    if ROUTER_ENABLED:
+        with span("intent_router"):
+            routed = await run_blocking(
+                intent_router.route, engine, req.query, req.email, req.top_product)
+        if routed is not None:
+            return routed, None
+
+    # ♻️ Cached answer? (order questions are scoped to the caller's email)
+    scope = answer_cache.scope_for(req.email, personal)
+    qvec = None
+    if answer_cache.embed_fn is not None and scope == PUBLIC_SCOPE:
+        # semantic match only for public questions: "đơn #12" vs "đơn #13"
+        # look alike to an embedding but must never share an answer
+        with span("embedding"):
+            qvec = await run_blocking(answer_cache.embed_fn, user_query)
+    cached = answer_cache.get(scope, user_query, qvec)
+    if cached is not None:
+        return {"answer": cached, "cached": True}, None
+
+    return None, {"user_query": user_query, "scope": scope, "qvec": qvec}
+
+
+@app.post("/sql")
+async def run_sql_agent(req: QueryRequest):
+    """Run SQL agent with a user query and return AI answer."""
+
+    early, ctx = await prepare_query(req)
+    if early is not None:
+        return early
+
+    # ⚡ astream → LLM calls use the async OpenAI client; sync SQL tools are
+    # executed off-loop by LangChain, so other requests keep being served
+    usage = UsageTracker()
+    executor = await run_blocking(agent_executor.get)  # no-op once warmed up
+    events = executor.astream(
+        {"messages": [("user", ctx["user_query"])]},
         stream_mode="values",
+        config={"callbacks": [agent_metrics, usage]},
     )
 
+    timer = Timer()
     final_answer = None
-    for event in events:
-        final_answer = event["messages"][-1].content
+    with span("agent"):
+        async for event in events:
+            final_answer = event["messages"][-1].content
+    log_event(log, "sql_agent_answer", ms=timer.ms, answer=final_answer, **usage.summary())
 
-        print(final_answer)
+    if final_answer is not None:
+        answer_cache.put(ctx["scope"], ctx["user_query"], final_answer, ctx["qvec"])
 
-    return {"answer": final_answer}
+    return {"answer": final_answer, "usage": usage.summary()}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/sql/stream")
+async def run_sql_agent_stream(req: QueryRequest):
+    """
+    Same as /sql but as Server-Sent Events:
+      token       → LLM text chunks as they arrive
+      tool_call   → agent decided to call a tool (name + args)
+      tool_result → tool output (truncated preview)
+      final       → {"answer": ..., "cached": bool}
+    """
+
+    async def event_stream():
+        early, ctx = await prepare_query(req)
+        if early is not None:
+            yield _sse("final", {"cached": False, **early})
+            return
+
+        final_answer = None
+        usage = UsageTracker()
+        try:
+            executor = await run_blocking(agent_executor.get)
+            async for mode, data in executor.astream(
+                {"messages": [("user", ctx["user_query"])]},
+                stream_mode=["messages", "updates"],
+                config={"callbacks": [agent_metrics, usage]},
+            ):
+                if mode == "messages":
+                    chunk, meta = data
+                    if meta.get("langgraph_node") == "agent" and chunk.content:
+                        yield _sse("token", {"content": chunk.content})
+                    continue
+
+                for node, update in data.items():
+                    for msg in (update or {}).get("messages", []):
+                        if node == "agent" and getattr(msg, "tool_calls", None):
+                            for call in msg.tool_calls:
+                                yield _sse("tool_call", {"name": call["name"],
+                                                         "args": call["args"]})
+                        elif node == "agent":
+                            final_answer = msg.content
+                        elif node == "tools":
+                            yield _sse("tool_result", {
+                                "name": getattr(msg, "name", None),
+                                "content": str(msg.content)[:500],
+                            })
+        except Exception as e:
+            log.error("sql_agent_stream_error", exc_info=e)
+            yield _sse("error", {"message": f"{type(e).__name__}: {e}"})
+            return
+
+        if final_answer is not None:
+            answer_cache.put(ctx["scope"], ctx["user_query"], final_answer, ctx["qvec"])
+        yield _sse("final", {"answer": final_answer, "cached": False,
+                             "usage": usage.summary()})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
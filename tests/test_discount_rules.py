@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+from discount_rules import DEFAULT_REASONS, DiscountRuleEngine
+from sale_anal_noloop import decide_discount_and_reason
+
+OPS = {
+    "<=": lambda a, b: a <= b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    ">": lambda a, b: a > b,
+}
+
+
+def inventories(rnd: random.Random, high: int, low: int, ratios=()) -> list[int]:
+    """Random quantities plus every rule boundary (±1)."""
+    edges = [low, high, 2 * high, 3 * high] + [round(r * high) for r in ratios]
+    qty = [e + d for e in edges for d in (-1, 0, 1)]
+    qty += [rnd.randint(0, 10 * max(abs(high), 1)) for _ in range(50)]
+    return [max(0, q) for q in qty]
+
+
+def first_match(rules: list, default: dict, qty: int, high: int, low: int):
+    """Per-row reference: walk the table top-down like the old if/elif ladder."""
+    for rule in rules:
+        value = {"low": low, "high": high}.get(rule["value"], rule["value"])
+        x = qty / high if rule["field"] == "ratio" else qty
+        if OPS[rule["op"]](x, value):
+            return rule["discount"], rule["reason"]
+    return default["discount"], default["reason"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_default_rules_match_per_row_ladder(seed):
+    rnd = random.Random(seed)
+    engine = DiscountRuleEngine()
+    for _ in range(50):
+        high = rnd.choice([rnd.randint(1, 500), rnd.randint(-50, -1)])
+        low = rnd.randint(0, 2 * abs(high))
+        qty = inventories(rnd, high, low)
+
+        discounts, codes = engine.evaluate(qty, high, low)
+        got = [(d, engine.reason_text(c)) for d, c in zip(discounts.tolist(), codes.tolist())]
+        assert got == [decide_discount_and_reason(q, high, low) for q in qty], (high, low)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_rule_tables_match_first_match_reference(seed):
+    rnd = random.Random(seed)
+    reasons = list(DEFAULT_REASONS)
+    rules = [{
+        "field": rnd.choice(["inventory_qty", "ratio"]),
+        "op": rnd.choice(list(OPS)),
+        "value": rnd.choice(["low", "high", rnd.randint(0, 200), rnd.choice([0.3, 0.5, 0.7, 1, 1.1, 1.2, 1.5, 2, 2.3, 3])]),
+        "discount": rnd.randint(0, 100),
+        "reason": rnd.choice(reasons),
+    } for _ in range(rnd.randint(1, 8))]
+    default = {"discount": rnd.randint(0, 100), "reason": rnd.choice(reasons)}
+    engine = DiscountRuleEngine(rules, DEFAULT_REASONS, default)
+
+    for _ in range(20):
+        high = rnd.randint(1, 300)
+        low = rnd.randint(0, 2 * high)
+        ratios = [r["value"] for r in rules
+                  if r["field"] == "ratio" and not isinstance(r["value"], str)]
+        qty = inventories(rnd, high, low, ratios)
+        discounts, codes = engine.evaluate(qty, high, low)
+        got = [(d, engine.reason_key(c)) for d, c in zip(discounts.tolist(), codes.tolist())]
+        assert got == [first_match(rules, default, q, high, low) for q in qty]
+
+
+@pytest.mark.parametrize("value, high, inv", [(1.1, 100, 110), (1.1, 50, 55), (0.7, 10, 7)])
+def test_decimal_ratio_boundaries(value, high, inv):
+    rules = [{"field": "ratio", "op": ">=", "value": value,
+              "discount": 10, "reason": "OVERSTOCK_1X"}]
+    default = {"discount": 0, "reason": "SAFE"}
+    engine = DiscountRuleEngine(rules, DEFAULT_REASONS, default)
+    discounts, _ = engine.evaluate([inv], high, 0)
+    assert discounts.tolist() == [first_match(rules, default, inv, high, 0)[0]]
+
+
+@pytest.mark.parametrize("op", list(OPS))
+@pytest.mark.parametrize("value", [0.3, 0.7, 1.1, 1.2, 2.3])
+def test_decimal_ratio_sweep(op, value):
+    rules = [{"field": "ratio", "op": op, "value": value,
+              "discount": 10, "reason": "OVERSTOCK_1X"}]
+    default = {"discount": 0, "reason": "SAFE"}
+    engine = DiscountRuleEngine(rules, DEFAULT_REASONS, default)
+    for high in range(1, 501):
+        qty = list(range(max(0, round(value * high) - 2), round(value * high) + 3))
+        discounts, _ = engine.evaluate(qty, high, 0)
+        assert discounts.tolist() == [first_match(rules, default, q, high, 0)[0] for q in qty], high
+
+
+def test_high_zero_is_rejected_like_the_ladder():
+    engine = DiscountRuleEngine()
+    # the ladder only divides once a row is above `low`
+    assert decide_discount_and_reason(0, 0, 5)[0] == 0
+    with pytest.raises(ZeroDivisionError):
+        decide_discount_and_reason(10, 0, 5)
+    with pytest.raises(ValueError):
+        engine.evaluate([0, 10], 0, 5)
+
+
+def test_high_zero_without_ratio_rules():
+    rules = [{"field": "inventory_qty", "op": "<=", "value": "low",
+              "discount": 0, "reason": "NEAR_OUT"}]
+    engine = DiscountRuleEngine(rules)
+    discounts, codes = engine.evaluate([0, 5, 6], 0, 5)
+    assert discounts.tolist() == [0, 0, 0]
+    assert [engine.reason_key(c) for c in codes.tolist()] == ["NEAR_OUT", "NEAR_OUT", "SAFE"]
+
+
+@pytest.mark.parametrize("value", ["medium", "LOW", None, True, [1]])
+def test_rejects_unknown_rule_values(value):
+    rules = [{"field": "ratio", "op": ">=", "value": value,
+              "discount": 5, "reason": "OVERSTOCK_1X"}]
+    with pytest.raises(ValueError):
+        DiscountRuleEngine(rules)
+
+
+@pytest.mark.parametrize("rule", [
+    {"field": "sold_qty", "op": ">=", "value": 1, "discount": 5, "reason": "SAFE"},
+    {"field": "ratio", "op": "==", "value": 1, "discount": 5, "reason": "SAFE"},
+    {"field": "ratio", "op": ">=", "value": 1, "discount": 101, "reason": "SAFE"},
+    {"field": "ratio", "op": ">=", "value": 1, "discount": 5, "reason": "UNKNOWN"},
+])
+def test_rejects_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        DiscountRuleEngine([rule])
@@ -0,0 +1,38 @@
+import pytest
+
+from intent_router import classify
+
+ASTROX = "Yonex Astrox 88D"
+
+
+@pytest.mark.parametrize("query, email, top_product, expected", [
+    # order status
+    ("Đơn hàng #12 giao chưa?", "a@b.c", None, ("order_status", {"order_id": "12", "email": "a@b.c"})),
+    ("trạng thái đơn 12", None, None, None),
+    ("đơn 12 và 13 giao chưa", "a@b.c", None, None),
+    # focused product
+    ("giá bao nhiêu vậy", None, ASTROX, ("product_price", {"name": ASTROX})),
+    ("Astrox 88D giá bao nhiêu?", None, ASTROX, ("product_price", {"name": ASTROX})),
+    ("còn hàng không shop", None, ASTROX, ("product_stock", {"name": ASTROX})),
+    ("đánh giá cây này thế nào", None, ASTROX, None),
+    ("còn bao nhiêu cái", None, ASTROX, None),
+    ("Có vợt nào giá rẻ hơn không?", None, ASTROX, None),
+    ("so sánh giá Astrox 88D và Astrox 99", None, ASTROX, None),
+    ("giá Astrox 99 bao nhiêu", None, ASTROX, None),
+    ("cho mình hỏi giá Nanoflare 800", None, ASTROX, None),
+    ("Victor Thruster còn hàng không", None, ASTROX, None),
+    # brand / category listings
+    ("Shop có những hãng nào?", None, None, ("brand_list", {})),
+    ("có các thương hiệu gì vậy", None, None, ("brand_list", {})),
+    ("danh sách thương hiệu", None, None, ("brand_list", {})),
+    ("which brands do you have?", None, None, ("brand_list", {})),
+    ("shop có những danh mục nào", None, None, ("category_list", {})),
+    ("danh sách các loại sản phẩm", None, None, ("category_list", {})),
+    ("Vợt của hãng Yonex nào tốt nhất?", None, None, None),
+    ("Yonex là hãng của nước nào", None, None, None),
+    ("Có những hãng nào đang giảm giá?", None, None, None),
+    ("danh mục các sản phẩm giảm giá", None, None, None),
+    ("vợt nào tốt cho người mới", None, None, None),
+])
+def test_classify(query, email, top_product, expected):
+    assert classify(query, email, top_product) == expected
@@ -0,0 +1,27 @@
+import pytest
+
+from order_access import extract_order_ids, mentions_order
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("đơn 123 giao chưa", ["123"]),
+    ("đơn hàng mã 123 của tôi giao chưa", ["123"]),
+    ("order id: 55", ["55"]),
+    ("mã đơn: 99", ["99"]),
+    ("Đơn hàng của tôi số 77", ["77"]),
+    ("ĐƠN HÀNG #42", ["42"]),
+    ("đơn hàng mã123", ["123"]),
+    ("order #12, #13 and 14", ["12", "13", "14"]),
+    ("đơn 12 và đơn 12", ["12"]),
+    # quantities are checked too: fail closed
+    ("đơn 123 có 2 sản phẩm", ["123", "2"]),
+    ("đơn hàng của tôi đâu", []),
+])
+def test_every_number_in_an_order_message_is_a_candidate(message, expected):
+    assert extract_order_ids(message) == expected
+
+
+@pytest.mark.parametrize("message", ["vợt 88D giá bao nhiêu", "có 3 màu không", ""])
+def test_no_ids_without_an_order_mention(message):
+    assert not mentions_order(message)
+    assert extract_order_ids(message) == []
@@ -0,0 +1,157 @@
+# token_budget.py
+import csv
+import io
+import math
+import os
+
+from langchain_community.tools.sql_database.tool import (
+    InfoSQLDatabaseTool,
+    QuerySQLDatabaseTool,
+)
+from langchain_core.messages import ToolMessage
+from sqlalchemy.exc import SQLAlchemyError
+
+TOKEN_MODEL = os.getenv("TOKEN_MODEL", "gpt-4o-mini")
+# Caps per tool result / schema dump, and for the whole history sent per ReAct step
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "1500"))
+SCHEMA_MAX_TOKENS = int(os.getenv("SCHEMA_MAX_TOKENS", "3000"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+# Older tool results are shrunk to this many tokens when the history is over budget
+STALE_TOOL_RESULT_TOKENS = int(os.getenv("STALE_TOOL_RESULT_TOKENS", "80"))
+CELL_MAX_CHARS = int(os.getenv("TOKEN_CELL_MAX_CHARS", "200"))
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """tiktoken encoding for TOKEN_MODEL; None (→ ~4 chars/token estimate) if unavailable."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(TOKEN_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # BPE files are downloaded on first use → offline boxes estimate instead
+            _encoding_failed = True
+            print("⚠️ tiktoken unavailable, estimating tokens as chars/4:", e, flush=True)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to at most `max_tokens` tokens, saying how much was dropped."""
+    enc = _get_encoding()
+    if enc is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        dropped = math.ceil((len(text) - max_tokens * 4) / 4)
+        return text[:max_tokens * 4] + f"\n… [truncated ~{dropped} tokens]"
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens]) + f"\n… [truncated {len(tokens) - max_tokens} tokens]"
+
+
+def rows_to_csv(rows: list[dict], max_tokens: int) -> str:
+    """
+    Header + one CSV line per row (no repeated keys / tuple reprs), adding rows
+    until the token budget is used up.
+    """
+    if not rows:
+        return "(0 rows)"
+    columns = list(rows[0].keys())
+
+    def line(values) -> str:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="").writerow(values)
+        return buf.getvalue()
+
+    def cell(value) -> str:
+        value = "" if value is None else str(value)
+        return value if len(value) <= CELL_MAX_CHARS else value[:CELL_MAX_CHARS] + "…"
+
+    out = [line(columns)]
+    used = count_tokens(out[0])
+    for i, row in enumerate(rows):
+        text_ = line(cell(row.get(c)) for c in columns)
+        cost = count_tokens(text_) + 1
+        if used + cost > max_tokens:
+            out.append(f"… (+{len(rows) - i} rows not shown; add LIMIT / aggregate)")
+            break
+        out.append(text_)
+        used += cost
+    return "\n".join(out)
+
+
+class BudgetedQuerySQLDatabaseTool(QuerySQLDatabaseTool):
+    """sql_db_query returning compact CSV capped at `max_tokens`."""
+
+    max_tokens: int = TOOL_RESULT_MAX_TOKENS
+
+    def _run(self, query: str, run_manager=None) -> str:
+        try:
+            rows = self.db._execute(query)
+        except SQLAlchemyError as e:
+            return f"Error: {e}"
+        return rows_to_csv([dict(r) for r in rows], self.max_tokens)
+
+
+class BudgetedInfoSQLDatabaseTool(InfoSQLDatabaseTool):
+    """sql_db_schema capped at `max_tokens`."""
+
+    max_tokens: int = SCHEMA_MAX_TOKENS
+
+    def _run(self, table_names: str, run_manager=None) -> str:
+        return truncate_tokens(super()._run(table_names, run_manager), self.max_tokens)
+
+
+def budget_tools(tools: list, db) -> list:
+    """Swap the toolkit's query / schema tools for their budgeted versions."""
+    out = []
+    for tool in tools:
+        if isinstance(tool, QuerySQLDatabaseTool):
+            tool = BudgetedQuerySQLDatabaseTool(db=db)
+        elif isinstance(tool, InfoSQLDatabaseTool):
+            tool = BudgetedInfoSQLDatabaseTool(db=db)
+        out.append(tool)
+    return out
+
+
+def _content_tokens(msg) -> int:
+    content = msg.content if isinstance(msg.content, str) else str(msg.content)
+    return count_tokens(content)
+
+
+def trim_history(messages: list, max_tokens: int = HISTORY_MAX_TOKENS) -> list:
+    """
+    Keep the history sent to the LLM under `max_tokens` by shrinking older
+    tool results (oldest first). Messages are never dropped, so every
+    tool_call keeps its ToolMessage and the request stays valid for OpenAI;
+    the latest tool result is left intact.
+    """
+    sizes = [_content_tokens(m) for m in messages]
+    total = sum(sizes)
+    if total <= max_tokens:
+        return messages
+
+    tool_positions = [i for i, m in enumerate(messages) if isinstance(m, ToolMessage)]
+    out = list(messages)
+    for i in tool_positions[:-1]:
+        if total <= max_tokens:
+            break
+        if sizes[i] <= STALE_TOOL_RESULT_TOKENS:
+            continue
+        short = truncate_tokens(str(out[i].content), STALE_TOOL_RESULT_TOKENS)
+        out[i] = out[i].model_copy(update={"content": short})
+        total -= sizes[i] - count_tokens(short)
+    return out
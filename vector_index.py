@@ -0,0 +1,181 @@
+# vector_index.py
+import threading
+import time
+
+import numpy as np
+
+from quantization import int8_dot, quantize_int8
+
+
+def distances_from_cosine(sims: np.ndarray, space: str) -> np.ndarray:
+    """
+    Cosine similarities → distances in a Chroma space, so both backends score
+    the same. "l2" (Chroma's default) is squared L2: 2 - 2cos for the unit
+    vectors both embedders return. "cosine" and "ip" are 1 - cos.
+    """
+    if space == "l2":
+        return 2 - 2 * sims
+    return 1 - sims
+
+
+class LocalVectorIndex:
+    """
+    In-memory copy of a Chroma collection for brute-force cosine search.
+    All embeddings live in one contiguous float32 matrix (rows L2-normalized),
+    so a query is a single mat-vec + argpartition instead of an HTTP round trip.
+    Results use the same shape and distance space as `collection.query` so
+    callers don't care which backend answered.
+    quantization="int8" keeps the matrix as int8 codes + per-row scales
+    (4x less memory, approximate scores).
+    """
+
+    def __init__(self, collection, page_size: int = 1000, refresh_seconds: float = 0,
+                 quantization: str = "none", retry_seconds: float = 30):
+        self.collection = collection
+        self.page_size = page_size
+        self.refresh_seconds = refresh_seconds
+        self.quantization = quantization
+        # after a failed load, wait this long before the next attempt
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._scales = None
+        self._ids: list = []
+        self._metadatas: list = []
+        self._documents: list = []
+        self.space = "l2"
+        self.loaded_at = None
+        self.failed_at = None
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    @property
+    def metadatas(self) -> list:
+        return self._metadatas
+
+    def refresh(self):
+        """Reload every embedding + metadata from Chroma (paged)."""
+        with self._refresh_lock:
+            try:
+                return self._load()
+            except Exception:
+                self.failed_at = time.time()
+                raise
+
+    def refresh_if_stale(self) -> bool:
+        """
+        Refresh when stale; True if this call reloaded. Concurrent callers
+        don't queue up behind a running refresh — they keep the current
+        snapshot (or fall back to Chroma) instead.
+        """
+        if not self.is_stale() or not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self._load()
+            return True
+        except Exception:
+            self.failed_at = time.time()
+            raise
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self):
+        ids, metas, docs, vecs = [], [], [], []
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["embeddings", "metadatas", "documents"],
+                limit=self.page_size,
+                offset=offset,
+            )
+            page_ids = page.get("ids") or []
+            if not page_ids:
+                break
+            ids.extend(page_ids)
+            metas.extend(page.get("metadatas") or [{}] * len(page_ids))
+            docs.extend(page.get("documents") or [None] * len(page_ids))
+            vecs.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page_ids)
+            if len(page_ids) < self.page_size:
+                break
+
+        matrix = np.vstack(vecs) if vecs else np.zeros((0, 0), dtype=np.float32)
+        if matrix.size:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        scales = None
+        if self.quantization == "int8" and matrix.size:
+            matrix, scales = quantize_int8(matrix)
+
+        space = (getattr(self.collection, "metadata", None) or {}).get("hnsw:space", "l2")
+
+        # 🔄 swap atomically so in-flight queries keep using the old snapshot
+        with self._lock:
+            self._matrix = matrix
+            self._scales = scales
+            self._ids = ids
+            self._metadatas = metas
+            self._documents = docs
+            self.space = space
+            self.loaded_at = time.time()
+            self.failed_at = None
+
+        print(f"📦 Local vector index loaded: {len(ids)} items", flush=True)
+        return len(ids)
+
+    def is_stale(self) -> bool:
+        if self.failed_at is not None and time.time() - self.failed_at < self.retry_seconds:
+            return False  # back off instead of hammering Chroma on every request
+        if self.loaded_at is None:
+            return True
+        return bool(self.refresh_seconds) and time.time() - self.loaded_at > self.refresh_seconds
+
+    def query(self, query_embeddings, n_results: int = 8) -> dict:
+        """Cosine search; returns {"ids", "metadatas", "documents", "distances"} like Chroma."""
+        with self._lock:
+            matrix, scales, ids = self._matrix, self._scales, self._ids
+            metas, docs, space = self._metadatas, self._documents, self.space
+
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        out = {"ids": [], "metadatas": [], "documents": [], "distances": []}
+        if not len(ids):
+            for _ in range(len(q)):
+                for k in out:
+                    out[k].append([])
+            return out
+
+        qnorm = np.linalg.norm(q, axis=1, keepdims=True)
+        qnorm[qnorm == 0] = 1.0
+        if scales is not None:
+            sims = int8_dot(matrix, scales, q / qnorm)
+        else:
+            sims = (q / qnorm) @ matrix.T  # (n_queries, n_items)
+
+        k = min(n_results, sims.shape[1])
+        for row in sims:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            out["ids"].append([ids[i] for i in top])
+            out["metadatas"].append([metas[i] for i in top])
+            out["documents"].append([docs[i] for i in top])
+            out["distances"].append(distances_from_cosine(row[top], space).tolist())
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "dim": int(self._matrix.shape[1]) if self._matrix.size else 0,
+            "quantization": self.quantization,
+            "space": self.space,
+            "matrix_bytes": int(self._matrix.nbytes)
+            + (int(self._scales.nbytes) if self._scales is not None else 0),
+            "loaded_at": self.loaded_at,
+            "refresh_seconds": self.refresh_seconds,
+            "failed_at": self.failed_at,
+        }